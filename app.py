@@ -1,24 +1,52 @@
 # app.py
 
 import os
+import logging
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkinterdnd2 import TkinterDnD
 from queue import Queue, Empty
+from datetime import datetime
 from tabs import setup_audio_tab, setup_image_tab, setup_text_tab, setup_video_tab
+from utils import tracing
+from utils.helpers import ensure_output_dir, update_status_label
+from utils.journal import BatchJournal
 from utils.logging_config import setup_logging
+from utils.output_paths import new_output
+from utils.scheduler import JobScheduler, ProgressEvent
+from utils.watcher import FolderWatcher
 
 # Setup Logging
 setup_logging()
 
+# Lower numbers run first when tabs compete for the shared workers: quick text
+# jobs are not stuck behind long video extractions.
+TAB_PRIORITIES = {"text": 0, "image": 1, "audio": 2, "video": 3}
+
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Multi-Utility Application")
+        self.queue = Queue()  # Shared Queue for all tabs
+        self.scheduler = JobScheduler(self.queue, notify=self.notify_dispatcher)
+        self.batches = {}
+        self.watchers = {}  # tab name -> list of FolderWatcher
         self.create_main_tabs()
         self.progress_bar = self.create_progress_bar()
+        self.progress_label = self.create_status_label()
         self.status_label = self.create_status_label()
-        self.queue = Queue()  # Shared Queue for all tabs
+        ttk.Button(self.root, text="Cancel all jobs", command=self.scheduler.cancel_tab).pack(pady=5)
+        self.trace_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.root, text="Record timing trace", variable=self.trace_var,
+                        command=lambda: tracing.enable(self.trace_var.get())).pack(pady=5)
+        # Read by watcher threads too, so kept as a plain attribute.
+        self.resume = True
+        resume_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.root, text="Skip files already done with the same settings", variable=resume_var,
+                        command=lambda: setattr(self, "resume", resume_var.get())).pack(pady=5)
+        root.bind("<<JobEvents>>", self.dispatch_events)
+        self.poll_events()
         root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def create_main_tabs(self):
@@ -42,7 +70,7 @@ class App:
         setup_video_tab(video_tab, self)
 
     def create_progress_bar(self):
-        progress = ttk.Progressbar(self.root, orient='horizontal', mode='indeterminate', length=280)
+        progress = ttk.Progressbar(self.root, orient='horizontal', mode='determinate', length=280)
         progress.pack(pady=20)
         return progress
 
@@ -51,17 +79,119 @@ class App:
         status_label.pack(pady=10)
         return status_label
 
-    def start_progress(self):
-        self.progress_bar.start()
+    def submit_batch(self, tab, items, job, max_concurrency=None, on_done=None, queue=None, slots=1):
+        return self.scheduler.submit(tab, items, job, priority=TAB_PRIORITIES.get(tab, 0),
+                                     max_concurrency=max_concurrency, on_done=on_done, queue=queue, slots=slots)
+
+    def journal(self, tab, options):
+        """A BatchJournal for one batch: jobs report to it instead of self.queue,
+        and its pending() skips files finished earlier when resume is on."""
+        return BatchJournal(tab, options, self.queue, resume=self.resume)
+
+    def create_watch_controls(self, parent, tab, extensions, make_submitter):
+        """Add "Watch folder" controls to a tab.
+
+        make_submitter() snapshots the tab's current settings and returns
+        submit(files), or None if the settings are invalid. A watched folder
+        keeps those settings: every new or changed file is submitted once its
+        writes have settled, and nothing already there is redone.
+        """
+        frame = ttk.Frame(parent)
+        frame.pack(pady=5)
+        include_existing = tk.BooleanVar(value=False)
+        watching_label = ttk.Label(parent, text="")
+
+        def start():
+            folder = filedialog.askdirectory(title="Folder to watch")
+            if not folder:
+                return
+            submit = make_submitter()
+            if submit is None:
+                return
+            watcher = FolderWatcher(folder, extensions, submit, include_existing=include_existing.get()).start()
+            self.watchers.setdefault(tab, []).append(watcher)
+            watching_label.config(text="Watching: " + ", ".join(w.folder for w in self.watchers[tab]))
+            update_status_label(self.status_label, f"Watching {folder} for new {tab} files")
+
+        def stop():
+            for watcher in self.watchers.pop(tab, []):
+                watcher.stop()
+            watching_label.config(text="")
+
+        ttk.Button(frame, text="Watch folder...", command=start).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame, text="Stop watching", command=stop).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(frame, text="Also process files already there", variable=include_existing).pack(side=tk.LEFT)
+        watching_label.pack()
+
+    def notify_dispatcher(self):
+        # Called from worker threads; Tk delivers the virtual event on the main loop.
+        try:
+            self.root.event_generate("<<JobEvents>>", when="tail")
+        except (RuntimeError, tk.TclError):
+            pass
+
+    def poll_events(self):
+        # Safety net for Tk builds that drop events generated off the main thread.
+        self.dispatch_events()
+        self.root.after(500, self.poll_events)
+
+    def dispatch_events(self, event=None):
+        try:
+            while True:
+                msg = self.queue.get_nowait()
+                if isinstance(msg, ProgressEvent):
+                    self.batches[msg.batch_id] = msg
+                else:
+                    update_status_label(self.status_label, msg[1])
+        except Empty:
+            pass
+        self.update_progress()
+
+    def update_progress(self):
+        if not self.batches:
+            return
+        done = sum(batch.done for batch in self.batches.values())
+        total = sum(batch.total for batch in self.batches.values())
+        elapsed = max(batch.elapsed for batch in self.batches.values())
+        rate = done / elapsed if elapsed > 0 else 0.0
+        self.progress_bar.config(maximum=max(total, 1), value=done)
+        self.progress_label.config(text=f"{done}/{total} files, {rate:.1f} files/s")
+        if all(batch.finished for batch in self.batches.values()):
+            self.progress_label.config(text=f"{done}/{total} files in {elapsed:.1f}s ({rate:.1f} files/s)")
+            self.batches.clear()
+            self.write_trace()
+
+    def write_trace(self):
+        # Saved next to the outputs of the first traced file, like the image manifests.
+        events = tracing.drain()
+        source = next((event["file"] for event in events if event["file"] and os.path.isfile(event["file"])), None)
+        if source is None:
+            return
+        # Serializing a large batch's trace takes seconds; keep it off the Tk thread.
+        threading.Thread(target=self.export_trace, args=(events, source), daemon=True).start()
 
-    def stop_progress(self):
-        self.progress_bar.stop()
+    def export_trace(self, events, source):
+        output_folder = os.path.join(os.path.dirname(source), "output")
+        try:
+            ensure_output_dir(output_folder)
+            with new_output(output_folder, "trace", f"_{datetime.now():%Y%m%d_%H%M%S}", "json") as output:
+                tracing.export_chrome_trace(events, output.temp_path)
+            logging.info("Stage timings:\n%s", tracing.summary_table(events))
+            message = f"Timing trace saved to: {output.path}"
+        except OSError as e:
+            message = f"Error: could not save timing trace: {e}"
+        self.queue.put((source, message))
+        self.notify_dispatcher()
 
     def update_status(self, message):
         self.status_label.config(text=message)
 
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            for watchers in self.watchers.values():
+                for watcher in watchers:
+                    watcher.stop()
+            self.scheduler.shutdown()
             self.root.destroy()
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+# benchmarks/corpus.py
+
+import os
+import json
+import random
+import itertools
+import shutil
+import subprocess
+
+SEED = 1234
+
+# Files generated per scale. Sizes are (width, height); durations in seconds.
+SCALES = {
+    "small": {
+        "images": 8, "image_sizes": [(640, 480), (1024, 768)],
+        "audio": 2, "audio_seconds": 5,
+        "video": 1, "video_seconds": 5, "video_size": (640, 360),
+        "text_files": 4, "text_mb": 1,
+    },
+    "medium": {
+        "images": 32, "image_sizes": [(1280, 720), (1920, 1080), (3000, 2000)],
+        "audio": 6, "audio_seconds": 30,
+        "video": 2, "video_seconds": 20, "video_size": (1280, 720),
+        "text_files": 8, "text_mb": 8,
+    },
+    "large": {
+        "images": 96, "image_sizes": [(1920, 1080), (3000, 2000), (6000, 4000)],
+        "audio": 12, "audio_seconds": 120,
+        "video": 4, "video_seconds": 60, "video_size": (1920, 1080),
+        "text_files": 8, "text_mb": 64,
+    },
+}
+
+IMAGE_FORMATS = ["jpg", "png", "bmp"]
+AUDIO_FORMATS = ["wav", "flac", "mp3"]
+
+def have_ffmpeg():
+    return shutil.which("ffmpeg") is not None
+
+def ensure_corpus(root, scale):
+    """Generate the corpus for scale under root/scale unless it is already there.
+
+    Everything is derived from SEED and the scale spec, so two machines get
+    the same inputs. The spec is stored next to the files; a changed spec
+    regenerates the corpus. Returns {"images": [...], "audio": [...],
+    "video": [...], "text": [...]}.
+    """
+    spec = dict(SCALES[scale], seed=SEED, ffmpeg=have_ffmpeg())
+    folder = os.path.join(root, scale)
+    spec_file = os.path.join(folder, "corpus.json")
+    if os.path.exists(spec_file):
+        with open(spec_file) as f:
+            stored = json.load(f)
+        if stored["spec"] == json.loads(json.dumps(spec)):
+            return stored["files"]
+    shutil.rmtree(folder, ignore_errors=True)
+    files = {
+        "images": make_images(os.path.join(folder, "images"), spec),
+        "audio": make_audio(os.path.join(folder, "audio"), spec) if spec["ffmpeg"] else [],
+        "video": make_video(os.path.join(folder, "video"), spec) if spec["ffmpeg"] else [],
+        "text": make_text(os.path.join(folder, "text"), spec),
+    }
+    with open(spec_file, 'w') as f:
+        json.dump({"spec": spec, "files": files}, f, indent=2)
+    return files
+
+def make_images(folder, spec):
+    from PIL import Image, ImageDraw
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(SEED)
+    files = []
+    for i in range(spec["images"]):
+        width, height = spec["image_sizes"][i % len(spec["image_sizes"])]
+        ext = IMAGE_FORMATS[i % len(IMAGE_FORMATS)]
+        # Gradients plus random shapes: compresses like a photo more than flat noise does.
+        img = Image.merge("RGB", [Image.linear_gradient("L").resize((width, height)),
+                                  Image.radial_gradient("L").resize((width, height)),
+                                  Image.linear_gradient("L").rotate(90).resize((width, height))])
+        draw = ImageDraw.Draw(img)
+        for _ in range(200):
+            x, y = rng.randrange(width), rng.randrange(height)
+            w, h = rng.randrange(1, width // 4), rng.randrange(1, height // 4)
+            draw.ellipse((x, y, x + w, y + h), fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(folder, f"image_{i:03d}_{width}x{height}.{ext}")
+        img.save(path, **({"quality": 90} if ext == "jpg" else {}))
+        files.append(path)
+    return files
+
+def make_audio(folder, spec):
+    os.makedirs(folder, exist_ok=True)
+    files = []
+    for i in range(spec["audio"]):
+        ext = AUDIO_FORMATS[i % len(AUDIO_FORMATS)]
+        path = os.path.join(folder, f"audio_{i:03d}.{ext}")
+        source = f"sine=frequency={220 + 110 * i}:sample_rate=44100:duration={spec['audio_seconds']}"
+        run_generator(["-f", "lavfi", "-i", source, "-ac", "2", "-fflags", "+bitexact", path])
+        files.append(path)
+    return files
+
+def make_video(folder, spec):
+    os.makedirs(folder, exist_ok=True)
+    width, height = spec["video_size"]
+    files = []
+    for i in range(spec["video"]):
+        path = os.path.join(folder, f"video_{i:03d}.mp4")
+        source = f"testsrc2=size={width}x{height}:rate=30:duration={spec['video_seconds']}"
+        run_generator(["-f", "lavfi", "-i", source, "-c:v", "libx264", "-preset", "veryfast", "-g", "60",
+                       "-pix_fmt", "yuv420p", "-threads", "1", "-fflags", "+bitexact", path])
+        files.append(path)
+    return files
+
+def make_text(folder, spec):
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(SEED)
+    # Zipf-like word frequencies, so deduplication sees realistic repetition.
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 12)))
+                  for _ in range(50000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    files = []
+    for i in range(spec["text_files"]):
+        path = os.path.join(folder, f"text_{i:03d}.txt")
+        target = spec["text_mb"] * 2 ** 20
+        written = 0
+        with open(path, 'w') as f:
+            while written < target:
+                line = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=4096)) + "\n"
+                f.write(line)
+                written += len(line)
+        files.append(path)
+    return files
+
+def run_generator(args):
+    subprocess.run(["ffmpeg", "-y", "-hide_banner", "-nostdin", "-loglevel", "error"] + args, check=True)
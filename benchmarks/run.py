@@ -0,0 +1,244 @@
+# benchmarks/run.py
+"""Benchmark the processing engines on a generated, deterministic corpus.
+
+    python -m benchmarks.run run --scale small
+    python -m benchmarks.run run --scale medium --output medium.json --baseline baseline.json
+    python -m benchmarks.run compare baseline.json medium.json
+
+Each case runs in its own process, so its peak RSS (including ffmpeg
+children) is measured in isolation. Results are written as JSON: per case the
+throughput (operations and MB per second), p50/p95 latency per operation and
+peak RSS. compare, or run with --baseline, lists metrics that got worse by
+more than --threshold and exits with status 1 if there are any.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.corpus import SCALES, ensure_corpus
+from utils.helpers import is_error_message
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_DIR = os.path.join(ROOT, "benchmarks", "corpus")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# metric -> True when higher is better
+METRICS = {
+    "ops_per_s": True,
+    "mb_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+def image_ops(files):
+    from engine.image import process_image
+    return [(lambda queue, path=path: process_image(path, "1024x1024", False, queue), [path]) for path in files]
+
+def audio_ops(files):
+    from engine.audio import process_audio_file
+    return [(lambda queue, path=path: process_audio_file(path, "mp3", 192, False, queue), [path]) for path in files]
+
+def video_ops(files):
+    from engine.video import process_video_file
+    from utils.parallel import default_worker_count
+    workers = default_worker_count()
+    return [(lambda queue, path=path: process_video_file(path, 5, queue, workers=workers), [path]) for path in files]
+
+def text_merge_ops(files):
+    from engine.text import merge_text_files
+    return [(lambda queue: merge_text_files(files, queue), files)]
+
+def text_dedup_ops(files):
+    from engine.text import deduplicate_text_files
+    return [(lambda queue, path=path: deduplicate_text_files(path, queue), [path]) for path in files]
+
+# name -> (corpus section, builder of [(operation(queue), input paths)])
+CASES = {
+    "image_resize": ("images", image_ops),
+    "audio_mp3": ("audio", audio_ops),
+    "video_frames": ("video", video_ops),
+    "text_merge": ("text", text_merge_ops),
+    "text_dedup": ("text", text_dedup_ops),
+}
+
+class MessageCollector:
+    """Queue stand-in that counts error messages from the engines."""
+
+    def __init__(self):
+        self.errors = []
+
+    def put(self, msg):
+        if is_error_message(msg[1]):
+            self.errors.append(msg[1])
+
+def percentile(values, fraction):
+    values = sorted(values)
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    unit = 1 if sys.platform == "darwin" else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak * unit / 2 ** 20, 1)
+
+def clean_outputs(paths):
+    for folder in {os.path.join(os.path.dirname(path), "output") for path in paths}:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def run_case(name, files, repeat):
+    """Run one case in this process and return its measurements."""
+    ops = CASES[name][1](files)
+    bytes_in = sum(os.path.getsize(path) for _, paths in ops for path in paths)
+    latencies = []
+    walls = []
+    collector = MessageCollector()
+    for _ in range(repeat):
+        clean_outputs(files)
+        start = time.perf_counter()
+        for operation, _ in ops:
+            op_start = time.perf_counter()
+            operation(collector)
+            latencies.append(time.perf_counter() - op_start)
+        walls.append(time.perf_counter() - start)
+    clean_outputs(files)
+    best = min(walls)
+    return {
+        "ops": len(ops),
+        "repeat": repeat,
+        "bytes_in": bytes_in,
+        "seconds": round(best, 4),
+        "ops_per_s": round(len(ops) / best, 3),
+        "mb_per_s": round(bytes_in / 2 ** 20 / best, 3),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "errors": collector.errors[:5],
+    }
+
+def run_suite(scale, cases, repeat, corpus_dir):
+    files = ensure_corpus(corpus_dir, scale)
+    results = {}
+    for name in cases:
+        section = CASES[name][0]
+        if not files[section]:
+            results[name] = {"skipped": f"no {section} files (is ffmpeg installed?)"}
+            print(f"{name}: skipped", file=sys.stderr)
+            continue
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.run", "case", name, "--scale", scale,
+                               "--repeat", str(repeat), "--corpus", corpus_dir],
+                              cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results[name] = {"failed": proc.stderr.strip().splitlines()[-1:] or ["unknown error"]}
+            print(f"{name}: failed", file=sys.stderr)
+            continue
+        results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name}: {results[name]['ops_per_s']} ops/s, p50 {results[name]['p50_ms']} ms, "
+              f"p95 {results[name]['p95_ms']} ms, peak {results[name]['peak_rss_mb']} MB", file=sys.stderr)
+    return {
+        "version": 1,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "scale": scale,
+        "repeat": repeat,
+        "commit": git_commit(),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "cases": results,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current, threshold):
+    """Return (lines, regressions) describing metric changes between two result files."""
+    lines = []
+    regressions = []
+    if baseline.get("scale") != current.get("scale"):
+        lines.append(f"warning: comparing scale {current.get('scale')} against {baseline.get('scale')}")
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None or "ops" not in base or "ops" not in result:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > threshold else ""
+            lines.append(f"{name:14} {metric:12} {old:>12} -> {new:<12} {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((name, metric, change))
+    return lines, regressions
+
+def report_comparison(baseline_file, current, threshold):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    lines, regressions = compare(baseline, current, threshold)
+    print("\n".join(lines))
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Generate the corpus if needed and run the benchmarks.")
+    run.add_argument("--scale", choices=list(SCALES), default="small")
+    run.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--corpus", default=CORPUS_DIR)
+    run.add_argument("--output", help="Result file (default: benchmarks/results/<scale>_<time>.json).")
+    run.add_argument("--baseline", help="Compare against this result file afterwards.")
+    run.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts as a regression.")
+    cmp = commands.add_parser("compare", help="Compare two result files.")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10)
+    case = commands.add_parser("case", help=argparse.SUPPRESS)
+    case.add_argument("name", choices=list(CASES))
+    case.add_argument("--scale", choices=list(SCALES), default="small")
+    case.add_argument("--repeat", type=int, default=3)
+    case.add_argument("--corpus", default=CORPUS_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "case":
+        files = ensure_corpus(args.corpus, args.scale)[CASES[args.name][0]]
+        print(json.dumps(run_case(args.name, files, max(1, args.repeat))))
+        return 0
+    if args.command == "compare":
+        with open(args.current) as f:
+            return report_comparison(args.baseline, json.load(f), args.threshold)
+
+    results = run_suite(args.scale, args.cases, max(1, args.repeat), os.path.abspath(args.corpus))
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.scale}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {output}", file=sys.stderr)
+    if args.baseline:
+        return report_comparison(args.baseline, results, args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
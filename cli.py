@@ -0,0 +1,257 @@
+# cli.py
+"""Run the image, audio, text and video engines without the GUI.
+
+    python cli.py image photos/ --size 1024x1024 --size 512x512 --format webp
+    python cli.py audio music/ --targets "mp3@320, flac"
+    python cli.py text notes/ --corpus --unit lines
+    python cli.py video clips/ --mode interval --seconds 2
+
+Progress is written to stdout as JSON lines, one object per event. Exit codes:
+0 when every file succeeded, 1 when some failed, 2 for usage errors or no
+input files, 130 when interrupted. --shard I/N processes every Nth file
+starting at I, so one batch can be split across machines. --trace FILE records
+how long each file spent in each stage, writes it as a Chrome trace (open it
+in https://ui.perfetto.dev) and prints a per-stage summary to stderr.
+--watch keeps running after the given files are done and processes every
+file that appears or changes in the given folders once its writes settle,
+until interrupted. Finished files are journaled in each output folder, so a
+rerun with the same settings skips them (see --no-resume).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import importlib
+from utils import tracing
+from queue import Empty, Queue
+from utils.helpers import is_error_message, iter_input_files
+from utils.journal import BatchJournal
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+class JsonLinesReporter:
+    """Stands in for the GUI queue: every (source, message) put is printed as JSON."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+        self.results = 0
+        self.failed = 0
+
+    def put(self, msg):
+        source, message = msg[0], msg[1]
+        failed = is_error_message(message)
+        with self.lock:
+            self.results += 1
+            self.failed += failed
+        self.emit("result", source=source, status="error" if failed else "ok", message=message)
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields})
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Multi-Utility Tool batch processing without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    image = add_command(commands, "image", "Crop, resize and sharpen images.")
+    image.add_argument("--size", action="append", dest="sizes", metavar="WxH",
+                       help="Output size; repeat for several sizes from one decode (default: 1024x1024).")
+    image.add_argument("--margin", action="store_true", help="Add a 16-pixel margin.")
+    image.add_argument("--format", choices=["png", "jpeg", "webp"], help="Output format (default: same as source).")
+    image.add_argument("--profile", choices=["default", "fastest", "smallest"], default="default")
+    image.add_argument("--manifest", action="store_true", help="Write a JSON manifest per output folder.")
+
+    audio = add_command(commands, "audio", "Convert audio files with ffmpeg.")
+    audio.add_argument("--targets", default="mp3@128", help='Comma-separated targets, e.g. "mp3@128, flac, wav/mono".')
+    audio.add_argument("--no-stream-copy", action="store_true", help="Always re-encode, even when the source matches.")
+    audio.add_argument("--timeout", type=int, default=0, help="Seconds per file, 0 for none.")
+
+    text = add_command(commands, "text", "Copy, merge or deduplicate text files.")
+    text.add_argument("--merge", action="store_true")
+    text.add_argument("--dedup", action="store_true", help="Remove duplicate words within each file.")
+    text.add_argument("--compact", action="store_true", help="Track words as hashed digests.")
+    text.add_argument("--memory-budget", type=int, default=256, metavar="MB")
+    text.add_argument("--corpus", action="store_true", help="Remove units already seen in an earlier file.")
+    text.add_argument("--unit", choices=["words", "lines"], default="words")
+
+    video = add_command(commands, "video", "Extract frames or training crops from videos.")
+    video.add_argument("--interval", type=int, default=1, help="Extract every nth frame.")
+    video.add_argument("--mode", choices=["nth", "interval", "keyframes", "count"], default="nth")
+    video.add_argument("--seconds", type=float, default=1.0, help="Seconds between frames in interval mode.")
+    video.add_argument("--count", type=int, default=100, help="Number of frames in count mode.")
+    video.add_argument("--dedup", choices=["scene", "decimate"])
+    video.add_argument("--dedup-threshold", type=float, default=0.03)
+    video.add_argument("--output", choices=["frames", "crops"], default="frames")
+    video.add_argument("--crop-size", default="512x512")
+    video.add_argument("--crop-margin", action="store_true")
+    return parser
+
+def add_command(commands, name, help_text):
+    command = commands.add_parser(name, help=help_text, description=help_text)
+    command.add_argument("paths", nargs="+", help="Files or folders to process.")
+    command.add_argument("--workers", type=int, help="Parallel workers (default: one per CPU core).")
+    command.add_argument("--shard", type=parse_shard, default=(0, 1), metavar="I/N",
+                         help="Only process files I, I+N, I+2N, ... of the sorted input.")
+    command.add_argument("--trace", metavar="FILE", help="Record per-stage timings to FILE as a Chrome trace.")
+    command.add_argument("--watch", action="store_true",
+                         help="Keep watching the given folders and process new or changed files.")
+    command.add_argument("--no-resume", action="store_true",
+                         help="Also process files an earlier run already finished with the same settings.")
+    return command
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 0..{count - 1}")
+    return index, count
+
+def build_options(args, engine):
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    if args.command == "image":
+        return {
+            "resolutions": args.sizes or ["1024x1024"],
+            "add_margin": args.margin,
+            "output_format": args.format,
+            "profile": args.profile,
+            "workers": workers,
+            "write_manifest": args.manifest,
+        }
+    if args.command == "audio":
+        return {
+            "targets": engine.parse_targets(args.targets),
+            "stream_copy": not args.no_stream_copy,
+            "workers": workers,
+            "timeout": args.timeout or None,
+        }
+    if args.command == "text":
+        return {
+            "merge": args.merge,
+            "deduplicate": args.dedup,
+            "compact": args.compact,
+            "memory_budget": args.memory_budget * 2 ** 20,
+            "corpus": args.corpus,
+            "unit": args.unit,
+            "workers": workers,
+        }
+    options = {
+        "frame_interval": args.interval,
+        "mode": args.mode,
+        "interval_seconds": args.seconds,
+        "frame_count": args.count,
+        "dedup": args.dedup,
+        "dedup_threshold": args.dedup_threshold,
+        "output": args.output,
+        "crop_resolution": args.crop_size,
+        "crop_margin": args.crop_margin,
+        "workers": workers,
+    }
+    engine.check_options(options)
+    return options
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Only the engine for this command is imported, so e.g. the text and
+    # audio commands never load Pillow.
+    engine = importlib.import_module(f"engine.{args.command}")
+    reporter = JsonLinesReporter()
+    try:
+        options = build_options(args, engine)
+    except ValueError as e:
+        reporter.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    index, count = args.shard
+    files = sorted(iter_input_files(args.paths, engine.EXTENSIONS))[index::count]
+    if args.watch:
+        return watch(args, engine, options, files, reporter)
+    if not files:
+        reporter.emit("error", message="No valid input files were found.")
+        return EXIT_USAGE
+
+    reporter.emit("start", command=args.command, files=len(files), options=options)
+    started = time.monotonic()
+    cancel_event = threading.Event()
+    tracing.enable(bool(args.trace))
+    queue = batch_queue(args, options, reporter)
+    try:
+        engine.process_dropped_files(pending_files(queue, files), options, queue, cancel_event)
+    except KeyboardInterrupt:
+        from utils.ffmpeg import cancel_ffmpeg
+        cancel_ffmpeg(cancel_event)
+        reporter.emit("interrupted", results=reporter.results, failed=reporter.failed)
+        return EXIT_INTERRUPTED
+    finally:
+        if args.trace:
+            write_trace(args.trace, reporter)
+    reporter.emit("done", files=len(files), results=reporter.results, failed=reporter.failed,
+                  skipped=getattr(queue, "skipped", 0), seconds=round(time.monotonic() - started, 3))
+    return EXIT_FAILED if reporter.failed else EXIT_OK
+
+def batch_queue(args, options, reporter):
+    """The queue the engine reports to: a BatchJournal in front of the reporter,
+    except for text corpus and merge runs, which depend on the whole batch."""
+    if args.command == "text" and (options["corpus"] or options["merge"]):
+        return reporter
+    return BatchJournal(args.command, options, reporter, resume=not args.no_resume)
+
+def pending_files(queue, files):
+    if isinstance(queue, BatchJournal):
+        return list(queue.pending(files))
+    return files
+
+def watch(args, engine, options, files, reporter):
+    """Process files, then every new or changed file under the given folders, until interrupted."""
+    from utils.watcher import FolderWatcher
+    folders = [path for path in args.paths if os.path.isdir(path)]
+    if not folders:
+        reporter.emit("error", message="--watch needs at least one folder.")
+        return EXIT_USAGE
+    ready = Queue()
+    if files:
+        ready.put(files)
+    watchers = [FolderWatcher(folder, engine.EXTENSIONS, ready.put).start() for folder in folders]
+    reporter.emit("watch", command=args.command, folders=[os.path.abspath(folder) for folder in folders],
+                  options=options)
+    cancel_event = threading.Event()
+    tracing.enable(bool(args.trace))
+    queue = batch_queue(args, options, reporter)
+    try:
+        while True:
+            # A timeout keeps the wait interruptible on Windows.
+            try:
+                batch = ready.get(timeout=0.5)
+            except Empty:
+                continue
+            reporter.emit("batch", files=len(batch))
+            engine.process_dropped_files(pending_files(queue, batch), options, queue, cancel_event)
+    except KeyboardInterrupt:
+        from utils.ffmpeg import cancel_ffmpeg
+        cancel_ffmpeg(cancel_event)
+    finally:
+        for watcher in watchers:
+            watcher.stop()
+        if args.trace:
+            write_trace(args.trace, reporter)
+    reporter.emit("done", results=reporter.results, failed=reporter.failed)
+    return EXIT_FAILED if reporter.failed else EXIT_OK
+
+def write_trace(path, reporter):
+    events = tracing.drain()
+    tracing.export_chrome_trace(events, path)
+    print(tracing.summary_table(events), file=sys.stderr)
+    reporter.emit("trace", file=os.path.abspath(path), events=len(events))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+# engine/__init__.py
+#
+# GUI-free processing for each tab: engine.image, engine.audio, engine.text and
+# engine.video. Import the submodule you need; nothing is loaded eagerly so the
+# CLI only pays for the engine it runs.
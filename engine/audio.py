@@ -0,0 +1,150 @@
+# engine/audio.py
+
+import os
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from utils.helpers import ensure_output_dir
+from utils.output_paths import PendingOutput
+from utils.ffmpeg import FFmpegCancelled, describe_error, run_ffmpeg
+from utils.probe import first_stream, probe_media, stream_bit_rate
+from utils import tracing
+
+AUDIO_FORMATS = ["mp3", "wav", "flac", "m4a", "aac", "ogg", "wma"]
+EXTENSIONS = tuple(f".{fmt}" for fmt in AUDIO_FORMATS)
+
+# The codec ffmpeg picks by default for each output format. A source already
+# in that codec can be stream-copied instead of re-encoded.
+TARGET_CODECS = {
+    "mp3": "mp3",
+    "wav": "pcm_s16le",
+    "flac": "flac",
+    "m4a": "aac",
+    "aac": "aac",
+    "ogg": "vorbis",
+    "wma": "wmav2",
+}
+
+def parse_targets(spec, default_bitrate=128):
+    """Parse "mp3@128, flac/mono" into (format, bitrate, mono) tuples."""
+    targets = []
+    for item in spec.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        item, _, flags = item.partition("/")
+        output_format, _, bitrate = item.partition("@")
+        output_format = output_format.strip()
+        if output_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio format: {output_format}")
+        if flags.strip() not in ("", "mono"):
+            raise ValueError(f"Unknown target option: {flags.strip()}")
+        target = (output_format, int(bitrate) if bitrate.strip() else default_bitrate, flags.strip() == "mono")
+        if target not in targets:
+            targets.append(target)
+    return targets
+
+def process_dropped_files(files, options, queue, cancel_event=None):
+    # ffmpeg does the work in child processes, so threads are enough to keep
+    # `workers` conversions running at once. Each job reports when it ends.
+    with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+        for file in files:
+            executor.submit(process_audio_targets, file, options["targets"], queue, options["timeout"], cancel_event,
+                            options["stream_copy"])
+
+def get_timestamped_suffix():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def process_audio_file(file_path, output_format, bitrate, convert_to_mono, queue, timeout=None, cancel_event=None):
+    process_audio_targets(file_path, [(output_format, bitrate, convert_to_mono)], queue, timeout, cancel_event)
+
+def process_audio_targets(file_path, targets, queue, timeout=None, cancel_event=None, stream_copy=True):
+    queue.put(convert_audio_result(file_path, targets, timeout, cancel_event, stream_copy))
+
+def convert_audio_result(file_path, targets, timeout=None, cancel_event=None, stream_copy=True):
+    try:
+        with tracing.stage("audio", file_path, measure_input=True):
+            results = convert_audio_targets(file_path, targets, timeout, cancel_event, stream_copy)
+            if tracing.enabled():
+                tracing.annotate(bytes_out=sum(os.path.getsize(output_file) for output_file, _ in results))
+        saved = [output_file if method == "encode" else f"{output_file} ({method})" for output_file, method in results]
+        return (file_path, f"Audio saved to: {', '.join(saved)}", [output_file for output_file, _ in results])
+    except FFmpegCancelled:
+        return (file_path, f"Cancelled: {file_path}")
+    except Exception as e:
+        return (file_path, f"Error: {describe_error(e)}")
+
+def convert_audio_targets(file_path, targets, timeout=None, cancel_event=None, stream_copy=True):
+    """Convert one source to every (format, bitrate, mono) target.
+
+    A single ffmpeg run with several outputs decodes and resamples the source
+    once for all targets. When stream_copy is set, targets the source already
+    satisfies are copied or remuxed instead of re-encoded.
+
+    Returns a list of (output file, method) with method "copy", "remux" or
+    "encode". Outputs are written under temporary names and only renamed into
+    place once every target is complete.
+    """
+    base_name, ext = os.path.splitext(os.path.basename(file_path))
+    output_folder = os.path.join(os.path.dirname(file_path), "output")
+    ensure_output_dir(output_folder)
+    source_info = probe_source(file_path, timeout) if stream_copy else None
+    outputs = []
+    ffmpeg_args = ["-i", file_path]
+    try:
+        for output_format, bitrate, convert_to_mono in targets:
+            suffix = f"_{bitrate}kbps" + ("_mono" if convert_to_mono else "")
+            output = PendingOutput(output_folder, base_name, suffix, output_format)
+            method = plan_audio_target(source_info, ext[1:].lower(), output_format, bitrate, convert_to_mono)
+            outputs.append((output, method))
+            if method == "copy":
+                with tracing.stage("copy"):
+                    shutil.copyfile(file_path, output.temp_path)
+                continue
+            if method == "remux":
+                ffmpeg_args.extend(["-vn", "-c:a", "copy"])
+            else:
+                ffmpeg_args.extend(output_args(output_format, bitrate, convert_to_mono))
+            ffmpeg_args.append(output.temp_path)
+        if len(ffmpeg_args) > 2:
+            run_ffmpeg(ffmpeg_args, timeout=timeout, cancel_event=cancel_event)
+        for output, _ in outputs:
+            output.publish()
+    except Exception:
+        # Don't leave truncated files behind after a kill or a failure.
+        for output, _ in outputs:
+            output.discard()
+        raise
+    return [(output.path, method) for output, method in outputs]
+
+def probe_source(file_path, timeout=None):
+    try:
+        return probe_media(file_path, timeout=timeout)
+    except Exception as e:
+        # Without probe data every target is simply re-encoded.
+        logging.warning(f"Could not probe {file_path}: {describe_error(e)}")
+        return None
+
+def plan_audio_target(source_info, source_ext, output_format, bitrate, convert_to_mono):
+    """Decide whether a target needs a "copy", a "remux" or a full "encode"."""
+    if source_info is None:
+        return "encode"
+    stream = first_stream(source_info, "audio")
+    if stream is None or stream.get("codec_name") != TARGET_CODECS[output_format]:
+        return "encode"
+    if convert_to_mono and stream.get("channels") != 1:
+        return "encode"
+    if output_format == "mp3":
+        source_bit_rate = stream_bit_rate(source_info, stream)
+        if source_bit_rate is None or source_bit_rate > bitrate * 1000:
+            return "encode"
+    return "copy" if source_ext == output_format else "remux"
+
+def output_args(output_format, bitrate, convert_to_mono):
+    args = []
+    if convert_to_mono:
+        args.extend(["-ac", "1"])
+    if output_format == "mp3":
+        args.extend(["-b:a", f"{bitrate}k"])
+    return args
@@ -0,0 +1,247 @@
+# engine/image.py
+
+import os
+import json
+import math
+import time
+from PIL import Image, ImageEnhance
+from utils.helpers import ensure_output_dir
+from utils.output_paths import new_output
+from utils.parallel import imap_process_pool
+from utils import tracing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+OUTPUT_FORMATS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+# Keyword arguments for Image.save, keyed by profile and Pillow format name.
+# "default" keeps Pillow's own settings.
+ENCODER_PROFILES = {
+    "default": {},
+    "fastest": {
+        "PNG": {"compress_level": 1},
+        "JPEG": {"quality": 85, "subsampling": "4:2:0"},
+        "WEBP": {"quality": 80, "method": 0},
+    },
+    "smallest": {
+        "PNG": {"compress_level": 9, "optimize": True},
+        "JPEG": {"quality": 80, "subsampling": "4:2:0", "optimize": True, "progressive": True},
+        "WEBP": {"quality": 80, "method": 6},
+    },
+}
+
+def process_dropped_files(files, options, queue, cancel_event=None):
+    if cancel_event is not None:
+        # Files are pulled lazily, so nothing new starts once the batch is cancelled.
+        files = (file for file in files if not cancel_event.is_set())
+    resolutions = options["resolutions"]
+    add_margin = options["add_margin"]
+    output_format = options.get("output_format")
+    profile = options.get("profile", "default")
+    workers = options.get("workers", 1)
+    if workers <= 1:
+        results = pipelined_results(files, resolutions, add_margin, output_format, profile)
+    else:
+        jobs = ((file, resolutions, add_margin, output_format, profile) for file in files)
+        if tracing.enabled():
+            results = pool_results(imap_process_pool(traced_image_job, jobs, workers=workers), traced=True)
+        else:
+            results = pool_results(imap_process_pool(process_image_job, jobs, workers=workers))
+
+    finished = []
+    for result in results:
+        queue.put(result[:3])
+        finished.append(result)
+    report_batch(finished, options, queue)
+
+def report_batch(results, options, queue):
+    """Post per-format encode totals and write manifests for a finished batch."""
+    manifest_entries = {}
+    encode_totals = {}
+    for result in results:
+        file_path, message, outputs, encode_stats = result
+        for label, size, seconds in encode_stats:
+            totals = encode_totals.setdefault(label, [0, 0, 0.0])
+            totals[0] += 1
+            totals[1] += size
+            totals[2] += seconds
+        output_folder = os.path.join(os.path.dirname(file_path), "output")
+        entry = {"source": file_path, "outputs": outputs}
+        if not outputs:
+            entry["error"] = message
+        manifest_entries.setdefault(output_folder, []).append(entry)
+
+    for label, (count, size, seconds) in encode_totals.items():
+        queue.put((label, f"Encoded {count} images as {label}: {size / 1e6:.2f} MB written in {seconds:.2f}s"))
+
+    if options.get("write_manifest"):
+        for output_folder, entries in manifest_entries.items():
+            manifest_file = write_batch_manifest(output_folder, entries, options)
+            queue.put((manifest_file, f"Manifest saved to: {manifest_file}"))
+
+def pipelined_results(files, resolutions, add_margin, output_format, profile):
+    # Encoding the previous file on a helper thread overlaps with decoding the
+    # next one; Pillow releases the GIL while it codes image data.
+    with ThreadPoolExecutor(max_workers=1) as encoder:
+        pending = None
+        for file in files:
+            prepared = prepare_image_job(file, resolutions, add_margin)
+            if pending is not None:
+                yield pending.result()
+            pending = encoder.submit(encode_image_job, file, prepared, add_margin, output_format, profile)
+        if pending is not None:
+            yield pending.result()
+
+def pool_results(pool_iter, traced=False):
+    for args, result, error in pool_iter:
+        if error is not None:
+            result = (args[0], f"Error: {error!r}", [], [])
+        elif traced:
+            result, events = result
+            tracing.merge(events)
+        yield result
+
+def write_batch_manifest(output_folder, entries, options):
+    ensure_output_dir(output_folder)
+    manifest = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "resolutions": list(options["resolutions"]),
+        "add_margin": options["add_margin"],
+        "output_format": options.get("output_format"),
+        "profile": options.get("profile", "default"),
+        "items": entries,
+    }
+    with new_output(output_folder, "manifest", f"_{get_timestamped_suffix()}", "json") as output:
+        with open(output.temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    return output.path
+
+def get_timestamped_suffix():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def process_image(file_path, resolution, add_margin, queue):
+    queue.put(process_image_job(file_path, [resolution], add_margin)[:3])
+
+def process_image_job(file_path, resolutions, add_margin, output_format=None, profile="default"):
+    # Runs in worker processes, so it only takes and returns picklable values.
+    prepared = prepare_image_job(file_path, resolutions, add_margin)
+    return encode_image_job(file_path, prepared, add_margin, output_format, profile)
+
+def traced_image_job(*args):
+    return tracing.call_traced(process_image_job, *args)
+
+def prepare_image_job(file_path, resolutions, add_margin):
+    try:
+        with tracing.stage("prepare", file_path, measure_input=True), Image.open(file_path) as src:
+            return list(transform_image_sizes(src, resolutions, add_margin))
+    except Exception as e:
+        return e
+
+def encode_image_job(file_path, prepared, add_margin, output_format=None, profile="default"):
+    if isinstance(prepared, Exception):
+        return (file_path, f"Error: {str(prepared)}", [], [])
+    output_files = []
+    try:
+        base_name, ext = os.path.splitext(os.path.basename(file_path))
+        output_folder = os.path.join(os.path.dirname(file_path), "output")
+        ensure_output_dir(output_folder)
+        output_ext = OUTPUT_FORMATS[output_format] if output_format else ext[1:]
+        encode_stats = []
+        for resolution, img in prepared:
+            suffix = f"_resized_{resolution}"
+            if add_margin:
+                suffix += "_margin"
+            suffix += "_sharpened"
+            with new_output(output_folder, base_name, suffix, output_ext) as output:
+                with tracing.stage("encode", file_path) as span:
+                    encode_stats.append(save_image(img, output.temp_path, profile))
+                    span.set(bytes_out=encode_stats[-1][1])
+            output_files.append(output.path)
+        return (file_path, f"Image saved to: {', '.join(output_files)}", output_files, encode_stats)
+    except Exception as e:
+        return (file_path, f"Error: {str(e)}", [], [])
+
+def save_image(img, output_file, profile="default"):
+    """Encode img to output_file with the given profile.
+
+    Returns (label, bytes written, encode seconds) for batch reporting.
+    """
+    image_format = Image.registered_extensions()[os.path.splitext(output_file)[1].lower()]
+    params = ENCODER_PROFILES[profile].get(image_format, {})
+    if image_format == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+        img = img.convert("RGB")
+    start = time.perf_counter()
+    img.save(output_file, format=image_format, **params)
+    seconds = time.perf_counter() - start
+    return (f"{image_format.lower()}/{profile}", os.path.getsize(output_file), seconds)
+
+def transform_image(img, resolution, add_margin):
+    """Crop, resize, margin and sharpen an opened image in one pass.
+
+    Large JPEGs are decoded at a reduced scale, and the centered square is
+    cropped and resized with a single resample call, so only the small output
+    is ever held at full resolution.
+    """
+    return finish_image(load_square(img, parse_resolution(resolution)), add_margin)
+
+def transform_image_sizes(img, resolutions, add_margin):
+    """Yield (resolution, image) for each resolution, largest first.
+
+    The source is decoded once for the largest size and every smaller size is
+    downscaled from the previous, unsharpened level.
+    """
+    ordered = sorted(set(resolutions), key=lambda res: parse_resolution(res), reverse=True)
+    level = None
+    for resolution in ordered:
+        new_size = parse_resolution(resolution)
+        if level is None:
+            level = load_square(img, new_size)
+        else:
+            with tracing.stage("crop_resize"):
+                level = level.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
+        yield resolution, finish_image(level.copy() if add_margin else level, add_margin)
+
+def load_square(img, new_size):
+    if img.format == "JPEG":
+        width, height = img.size
+        scale = max(new_size) / min(width, height)
+        if scale < 1:
+            img.draft(img.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+    with tracing.stage("decode"):
+        img.load()
+    with tracing.stage("crop_resize"):
+        return img.resize(new_size, Image.LANCZOS, box=square_crop_box(img.size), reducing_gap=3.0)
+
+def finish_image(img, add_margin):
+    with tracing.stage("sharpen"):
+        if add_margin:
+            img = fill_image_inner_margin(img)
+        return sharpen_image(img)
+
+def square_crop_box(size):
+    width, height = size
+    min_side = min(width, height)
+    left = (width - min_side) // 2
+    top = (height - min_side) // 2
+    return (left, top, left + min_side, top + min_side)
+
+def parse_resolution(resolution):
+    return tuple(map(int, resolution.split("x")))
+
+def fill_image_inner_margin(img, margin=16):
+    # Paints a white border over the edges in place instead of pasting onto a new canvas.
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    width, height = img.size
+    white = (255, 255, 255)
+    img.paste(white, (0, 0, width, margin))
+    img.paste(white, (0, height - margin, width, height))
+    img.paste(white, (0, margin, margin, height - margin))
+    img.paste(white, (width - margin, margin, width, height - margin))
+    return img
+
+def sharpen_image(img):
+    enhancer = ImageEnhance.Sharpness(img)
+    return enhancer.enhance(1.5)
@@ -0,0 +1,124 @@
+# engine/text.py
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from utils.helpers import ensure_output_dir
+from utils.output_paths import PARTIAL_PREFIX, PendingOutput, new_output
+from utils.corpus_dedup import dedupe_corpus
+from utils.fastcopy import copy_file, merge_files
+from utils.text_stream import dedupe_words
+from utils import tracing
+
+EXTENSIONS = (".txt",)
+
+def process_dropped_files(files, options, queue, cancel_event=None):
+    if options["corpus"]:
+        deduplicate_corpus(files, queue, options["unit"], options["merge"], options["workers"])
+        return
+    if options["merge"]:
+        merge_text_files(files, queue)
+        return
+    for file in files:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        process_text_options(file, options, queue)
+
+def process_text_options(file_path, options, queue):
+    try:
+        if options["deduplicate"]:
+            return deduplicate_text_files(file_path, queue, options["memory_budget"], options["compact"])
+        return process_text_file(file_path, queue)
+    except Exception as e:
+        queue.put((file_path, f"Error: {str(e)}"))
+
+def get_timestamped_suffix():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def process_text_file(file_path, queue):
+    try:
+        base_name, ext = os.path.splitext(os.path.basename(file_path))
+        output_folder = os.path.join(os.path.dirname(file_path), "output")
+        ensure_output_dir(output_folder)
+        with new_output(output_folder, base_name, "", ext[1:]) as output, \
+                tracing.stage("copy", file_path, measure_input=True):
+            copy_file(file_path, output.temp_path)
+        queue.put((file_path, f"Text file saved to: {output.path}", [output.path]))
+        return output.path
+    except Exception as e:
+        queue.put((file_path, f"Error: {str(e)}"))
+
+    
+def merge_text_files(file_paths, queue):
+    try:
+        base_name = "merged"
+        ext = "txt"
+        output_folder = os.path.join(os.path.dirname(file_paths[0]), "output")
+        ensure_output_dir(output_folder)
+        with new_output(output_folder, base_name, "", ext) as output, \
+                tracing.stage("merge", file_paths[0]) as span:
+            merge_files(file_paths, output.temp_path, separator=b"\n---\n")
+            span.set(bytes_out=os.path.getsize(output.temp_path))
+        queue.put((file_paths[0], f"Text files merged and saved to: {output.path}"))
+    except Exception as e:
+        queue.put((file_paths[0], f"Error: {str(e)}"))
+
+def deduplicate_text_files(file_path, queue, memory_budget=256 * 2 ** 20, compact=False):
+    try:
+        base_name, ext = os.path.splitext(os.path.basename(file_path))
+        output_folder = os.path.join(os.path.dirname(file_path), "output")
+        ensure_output_dir(output_folder)
+        with new_output(output_folder, base_name, "_deduplicated", ext[1:]) as output, \
+                tracing.stage("dedup", file_path, measure_input=True):
+            with open(output.temp_path, 'w') as outfile:
+                total, unique = dedupe_words(file_path, outfile, memory_budget, compact, temp_dir=output_folder)
+        queue.put((file_path, f"Duplicate words removed ({unique} of {total} words kept), file saved to: {output.path}",
+                   [output.path]))
+        return output.path
+    except Exception as e:
+        queue.put((file_path, f"Error: {str(e)}"))
+
+def deduplicate_corpus(file_paths, queue, unit="words", merge=False, workers=None):
+    """Remove words or lines already seen in an earlier file of the batch.
+
+    With merge set, the deduplicated files are concatenated into one output.
+    """
+    try:
+        output_folder = os.path.join(os.path.dirname(file_paths[0]), "output")
+        ensure_output_dir(output_folder)
+        # Each output is written under a temporary name and published once it is complete.
+        if merge:
+            temp_folder = tempfile.mkdtemp(prefix=PARTIAL_PREFIX, dir=output_folder)
+            temp_files = [os.path.join(temp_folder, f"{i}.txt") for i in range(len(file_paths))]
+            outputs = [None] * len(file_paths)
+        else:
+            outputs = []
+            for file_path in file_paths:
+                base_name, ext = os.path.splitext(os.path.basename(file_path))
+                folder = os.path.join(os.path.dirname(file_path), "output")
+                ensure_output_dir(folder)
+                outputs.append(PendingOutput(folder, base_name, "_corpus_deduplicated", ext[1:]))
+            temp_files = [output.temp_path for output in outputs]
+        try:
+            with tracing.stage("corpus_dedup", file_paths[0]):
+                results = dedupe_corpus(file_paths, temp_files, unit, workers, temp_dir=output_folder)
+                for (file_path, total, unique, error), output in zip(results, outputs):
+                    if error is not None:
+                        queue.put((file_path, f"Error: {error}"))
+                        continue
+                    saved_to = "" if output is None else f", saved to: {output.publish()}"
+                    queue.put((file_path, f"{unique} unique and {total - unique} duplicate {unit} in {file_path}{saved_to}"))
+            if merge:
+                with new_output(output_folder, "merged", "_corpus_deduplicated", "txt") as merged:
+                    merge_files([path for path in temp_files if os.path.exists(path)], merged.temp_path, separator=b"")
+                queue.put((file_paths[0], f"Corpus deduplicated and merged to: {merged.path}"))
+        finally:
+            if merge:
+                shutil.rmtree(temp_folder, ignore_errors=True)
+            else:
+                for output in outputs:
+                    if output.path is None:
+                        output.discard()
+    except Exception as e:
+        queue.put((file_paths[0], f"Error: {str(e)}"))
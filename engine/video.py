@@ -0,0 +1,372 @@
+# engine/video.py
+
+import os
+import math
+import bisect
+import shutil
+import tempfile
+import subprocess
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from utils.helpers import ensure_output_dir
+from utils.output_paths import partial_folder, publish_sequence
+from utils.ffmpeg import FFmpegCancelled, describe_error, read_raw_frames, run_ffmpeg
+from utils.probe import display_size, first_stream, frame_duration, media_span, probe_media, probe_video_frames
+from utils import tracing
+
+EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Videos shorter than two of these are extracted in a single pass.
+MIN_SEGMENT_SECONDS = 30
+
+# Filters that drop near-identical frames before they are encoded. "scene"
+# keeps frames whose scene-change score exceeds the threshold; "decimate"
+# drops frames that barely differ from the last kept one.
+DEDUP_FILTERS = {
+    "scene": lambda threshold: f"select=eq(n\\,0)+gt(scene\\,{threshold})",
+    "decimate": lambda threshold: "mpdecimate",
+}
+
+SAMPLING_MODES = {
+    "nth": "Every nth frame",
+    "interval": "One frame every N seconds",
+    "keyframes": "Keyframes only",
+    "count": "Fixed number of frames",
+}
+
+# Modes that decode a stream of frames, which the dedup filters and training
+# crops work on. The seek-based modes run one ffmpeg per frame.
+FRAME_STREAM_MODES = ("nth", "keyframes")
+
+def check_options(options):
+    """Raise ValueError if options combine settings that cannot work together."""
+    check_sampling(options["mode"], options["dedup"], options["output"])
+
+def check_sampling(mode, dedup, output):
+    if dedup and mode not in FRAME_STREAM_MODES:
+        raise ValueError("Dropping near-duplicate frames needs the every-nth or keyframe sampling mode")
+    if output == "crops" and mode not in FRAME_STREAM_MODES:
+        raise ValueError("Training crops need the every-nth or keyframe sampling mode")
+
+def process_dropped_files(files, options, queue, cancel_event=None):
+    for file in files:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        process_video_options(file, options, queue, cancel_event)
+
+def process_video_options(file_path, options, queue, cancel_event=None):
+    try:
+        with tracing.stage("video", file_path, measure_input=True):
+            process_video_file(file_path, options["frame_interval"], queue, workers=options["workers"],
+                               cancel_event=cancel_event, mode=options["mode"],
+                               interval_seconds=options["interval_seconds"], frame_count=options["frame_count"],
+                               dedup=options["dedup"], dedup_threshold=options["dedup_threshold"],
+                               output=options["output"], crop_resolution=options["crop_resolution"],
+                               crop_margin=options["crop_margin"])
+    except Exception as e:
+        queue.put((file_path, f"Error: {str(e)}"))
+
+def process_video_file(file_path, frame_interval, queue, workers=1, cancel_event=None, mode="nth",
+                       interval_seconds=1.0, frame_count=100, dedup=None, dedup_threshold=0.03, output="frames",
+                       crop_resolution="512x512", crop_margin=False):
+    try:
+        base_name, ext = os.path.splitext(os.path.basename(file_path))
+        output_folder = os.path.join(os.path.dirname(file_path), "output", "frames")
+        check_sampling(mode, dedup, output)
+        dedup_filter = DEDUP_FILTERS[dedup](dedup_threshold) if dedup else None
+        if output == "crops":
+            crops_folder = os.path.join(os.path.dirname(file_path), "output", "crops")
+            ensure_output_dir(crops_folder)
+            count, written, paths = extract_training_crops(file_path, frame_interval, mode, crops_folder, base_name,
+                                                       crop_resolution, crop_margin, workers, cancel_event,
+                                                       dedup_filter)
+            tracing.annotate(bytes_out=written)
+            queue.put((file_path, f"Training crops saved to: {crops_folder} ({count} frames streamed, "
+                                  f"{written / 1e6:.1f} MB written)", paths))
+            return
+        # Frames are extracted into a hidden folder and only moved into place
+        # once extraction succeeded. A rerun gets its own numbered sequence
+        # (name_001_0001.png, ...) instead of overwriting an earlier run's.
+        ensure_output_dir(output_folder)
+        with partial_folder(output_folder) as work_folder:
+            output_pattern = os.path.join(work_folder, "%04d.png")
+            # Only every-nth extraction needs the packet list (a demux pass over
+            # the whole file); the sparse modes seek or skip, so their cost
+            # follows the number of frames written.
+            if mode == "keyframes":
+                decoded, emitted = extract_keyframes(file_path, output_pattern, cancel_event, dedup_filter)
+            elif mode in ("interval", "count"):
+                info = probe_media(file_path)
+                start, duration = media_span(info)
+                times = sample_times(start, duration, mode, interval_seconds, frame_count, frame_duration(info))
+                decoded, emitted = extract_at_times(file_path, times, output_pattern, workers, cancel_event)
+            else:
+                decoded, emitted = extract_every_nth(file_path, probe_video_frames(file_path), frame_interval,
+                                                     output_pattern, workers, cancel_event, dedup_filter)
+            # A seek that found no frame leaves a gap; the published sequence has none.
+            frames = [(number, path) for number, (_, path) in enumerate(numbered_files(work_folder), 1)]
+            _, paths = publish_sequence(frames, output_folder, base_name,
+                                        lambda stem, number: f"{stem}_{number:04d}.png")
+        message = f"Frames extracted to: {output_folder} (decoded {decoded} frames, emitted {emitted})"
+        if decoded is None:
+            message = f"Frames extracted to: {output_folder} (emitted {emitted} frames by seeking)"
+        if dedup_filter:
+            considered, kept, kept_bytes = emitted
+            dropped = considered - kept
+            tracing.annotate(bytes_out=kept_bytes)
+            saved = dropped * kept_bytes / kept if kept else 0
+            message = (f"Frames extracted to: {output_folder} (decoded {decoded} frames; dedup considered {considered}, "
+                       f"kept {kept}, dropped {dropped}, ~{saved / 1e6:.1f} MB saved)")
+        queue.put((file_path, message, paths))
+    except FFmpegCancelled:
+        queue.put((file_path, f"Cancelled: {file_path}"))
+    except (subprocess.CalledProcessError, ValueError) as e:
+        queue.put((file_path, f"Error: {describe_error(e)}"))
+    except Exception as err:
+        queue.put((file_path, f"Unexpected error: {str(err)}"))
+
+def extract_every_nth(file_path, frames, frame_interval, output_pattern, workers=1, cancel_event=None,
+                      dedup_filter=None):
+    """Extract every nth frame; every frame is decoded."""
+    segments = plan_segments(frames, workers) if workers > 1 else None
+    considered = -(-len(frames) // frame_interval)
+    if dedup_filter:
+        kept, kept_bytes = extract_deduplicated(
+            [dedup_segment_args(file_path, frame_interval, segment, dedup_filter, len(frames))
+             for segment in segments or [(0, len(frames), None)]],
+            output_pattern, workers, cancel_event)
+        return len(frames), (considered, kept, kept_bytes)
+    if segments and len(segments) > 1:
+        run_parallel([segment_args(file_path, frame_interval, segment, output_pattern) for segment in segments],
+                     len(segments), cancel_event)
+    else:
+        # Use ffmpeg to extract frames with padded file names
+        ffmpeg_args = [
+            "-i", file_path, "-vf", f"select=not(mod(n\\,{frame_interval})),setpts=N/TB",
+            "-vsync", "vfr", output_pattern
+        ]
+        run_ffmpeg(ffmpeg_args, cancel_event=cancel_event)
+    return len(frames), considered
+
+def extract_keyframes(file_path, output_pattern, cancel_event=None, dedup_filter=None):
+    """Extract keyframes only; the decoder skips every other frame."""
+    if dedup_filter:
+        # Dedup stats need the number of keyframes considered, which only the packet list gives.
+        keyframes = sum(1 for _, is_key in probe_video_frames(file_path) if is_key)
+        kept, kept_bytes = extract_deduplicated(
+            [lambda pattern: ["-skip_frame", "nokey", "-i", file_path, "-vf", dedup_filter, "-vsync", "vfr", pattern]],
+            output_pattern, 1, cancel_event)
+        return keyframes, (keyframes, kept, kept_bytes)
+    ffmpeg_args = ["-skip_frame", "nokey", "-i", file_path, "-vsync", "vfr", output_pattern]
+    run_ffmpeg(ffmpeg_args, cancel_event=cancel_event)
+    keyframes = count_frames(output_pattern)
+    return keyframes, keyframes
+
+def extract_training_crops(file_path, frame_interval, mode, output_folder, base_name, resolution, add_margin,
+                           workers=1, cancel_event=None, dedup_filter=None):
+    """Stream raw frames from ffmpeg straight into the image transforms.
+
+    ffmpeg writes rgb0 frames to a pipe. Pillow can only map 4-byte pixels
+    like RGBX without copying, so each frame is wrapped in place by
+    Image.frombuffer, then cropped and resized straight from that buffer;
+    only the small result is converted to RGB, sharpened and encoded to PNG
+    on a thread pool. No intermediate frame PNGs are written. Returns (frames,
+    bytes written, crop paths).
+    """
+    width, height = display_size(first_stream(probe_media(file_path), "video"))
+    frame_size = width * height * 4
+    free_buffers = Queue()
+    for _ in range(workers * 2):
+        free_buffers.put(bytearray(frame_size))
+
+    input_args = ["-skip_frame", "nokey"] if mode == "keyframes" else []
+    filters = [] if mode == "keyframes" else [f"select=not(mod(n\\,{frame_interval}))"]
+    if dedup_filter:
+        filters.append(dedup_filter)
+    ffmpeg_args = input_args + ["-i", file_path]
+    if filters:
+        ffmpeg_args.extend(["-vf", ",".join(filters)])
+    ffmpeg_args.extend(["-vsync", "vfr", "-f", "rawvideo", "-pix_fmt", "rgb0", "pipe:1"])
+
+    suffix = f"_resized_{resolution}" + ("_margin" if add_margin else "") + "_sharpened"
+    jobs = []
+    with partial_folder(output_folder) as work_folder:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = read_raw_frames(ffmpeg_args, frame_size, free_buffers, cancel_event)
+            crop = tracing.carry_file(crop_frame)
+            for number, buffer in enumerate(frames, 1):
+                output_file = os.path.join(work_folder, f"{number:04d}.png")
+                jobs.append(executor.submit(crop, buffer, (width, height), resolution, add_margin, output_file,
+                                            free_buffers))
+            written = sum(job.result() for job in jobs)
+        _, paths = publish_sequence(numbered_files(work_folder), output_folder, base_name,
+                                    lambda stem, number: f"{stem}_{number:04d}{suffix}.png")
+    return len(jobs), written, paths
+
+def crop_frame(buffer, size, resolution, add_margin, output_file, free_buffers):
+    # Pillow is only needed for crops; plain frame extraction never loads it.
+    from PIL import Image
+    from engine.image import finish_image, load_square, parse_resolution
+    try:
+        frame = Image.frombuffer("RGBX", size, buffer, "raw", "RGBX", 0, 1)
+        img = load_square(frame, parse_resolution(resolution)).convert("RGB")
+        del frame
+    finally:
+        # The resize made its own small copy, so the reader can reuse the buffer.
+        free_buffers.put(buffer)
+    img = finish_image(img, add_margin)
+    with tracing.stage("encode") as span:
+        img.save(output_file)
+        written = os.path.getsize(output_file)
+        span.set(bytes_out=written)
+    return written
+
+def extract_deduplicated(arg_builders, output_pattern, workers=1, cancel_event=None):
+    """Run dedup jobs into temporary folders, then number the kept frames.
+
+    How many frames survive dedup in each segment is only known afterwards,
+    so each job writes its own sequence and the results are renamed into one
+    continuous _%04d sequence in segment order. Returns (kept, kept_bytes).
+    """
+    output_folder = os.path.dirname(output_pattern)
+    temp_folders = [tempfile.mkdtemp(prefix=".dedup_", dir=output_folder) for _ in arg_builders]
+    try:
+        run_parallel([build(os.path.join(folder, "%08d.png")) for build, folder in zip(arg_builders, temp_folders)],
+                     workers, cancel_event)
+        kept = 0
+        kept_bytes = 0
+        with tracing.stage("rename_frames"):
+            for folder in temp_folders:
+                for name in sorted(os.listdir(folder)):
+                    kept += 1
+                    frame_file = output_pattern % kept
+                    os.replace(os.path.join(folder, name), frame_file)
+                    kept_bytes += os.path.getsize(frame_file)
+        return kept, kept_bytes
+    finally:
+        for folder in temp_folders:
+            shutil.rmtree(folder, ignore_errors=True)
+
+def dedup_segment_args(file_path, frame_interval, segment, dedup_filter, total_frames):
+    def build(pattern):
+        start, end, seek_time = segment
+        args = []
+        if seek_time is not None:
+            args.extend(["-seek_timestamp", "1", "-ss", f"{seek_time:.6f}"])
+        filters = [f"select=not(mod(n+{start}\\,{frame_interval}))", dedup_filter, "setpts=N/TB"]
+        if end < total_frames:
+            # The number of kept frames is unknown, so stop on the input side.
+            filters.insert(0, f"trim=end_frame={end - start}")
+        args.extend(["-i", file_path, "-vf", ",".join(filters), "-vsync", "vfr", pattern])
+        return args
+    return build
+
+def extract_at_times(file_path, times, output_pattern, workers=1, cancel_event=None):
+    """Extract one frame at each time with input seeking.
+
+    Each sample decodes only from the keyframe before it, so the cost follows
+    the number of output frames rather than the length of the video. How many
+    frames that is depends on the keyframe spacing and is not counted, so
+    decoded comes back as None. Returns (None, frames written); a seek that
+    finds no frame writes nothing.
+    """
+    run_parallel([time_args(file_path, seek_time, number, output_pattern) for number, seek_time in enumerate(times, 1)],
+                 workers, cancel_event)
+    return None, len(numbered_files(os.path.dirname(output_pattern)))
+
+def sample_times(start, duration, mode, interval_seconds=1.0, frame_count=100, frame_seconds=0.0):
+    """Seek times for the interval and count modes.
+
+    The last frame is shown from start + duration - frame_seconds, and a seek
+    past its timestamp finds nothing, so times are kept half a frame before
+    it (or before start + duration when the frame rate is unknown).
+    """
+    if duration <= 0:
+        return []
+    if mode == "count":
+        times = [start + duration * i / frame_count for i in range(frame_count)]
+    else:
+        times = [start + interval_seconds * i for i in range(math.ceil(duration / interval_seconds))]
+    if frame_seconds <= 0:
+        return times
+    last = max(start, start + duration - 1.5 * frame_seconds)
+    return [min(seek_time, last) for seek_time in times]
+
+def count_frames(output_pattern):
+    """Number of frames written to the _%04d sequence output_pattern, counted from 1."""
+    count = 0
+    while os.path.exists(output_pattern % (count + 1)):
+        count += 1
+    return count
+
+def numbered_files(folder):
+    """[(number, path), ...] of the %04d.png frames in folder, in order."""
+    frames = []
+    for name in os.listdir(folder):
+        number, ext = os.path.splitext(name)
+        if ext == ".png" and number.isdigit():
+            frames.append((int(number), os.path.join(folder, name)))
+    return sorted(frames)
+
+def time_args(file_path, seek_time, number, output_pattern):
+    return ["-seek_timestamp", "1", "-ss", f"{seek_time:.6f}", "-i", file_path,
+            "-frames:v", "1", "-start_number", str(number), output_pattern]
+
+def run_parallel(ffmpeg_arg_lists, workers, cancel_event=None):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        run = tracing.carry_file(run_ffmpeg)
+        jobs = [executor.submit(run, args, cancel_event=cancel_event) for args in ffmpeg_arg_lists]
+        for job in jobs:
+            job.result()
+
+def plan_segments(frames, workers, min_segment_seconds=MIN_SEGMENT_SECONDS):
+    """Split a video into keyframe-aligned segments for parallel extraction.
+
+    frames is the probe_video_frames() list. Returns (start_frame, end_frame,
+    seek_time) tuples, where frame numbers index the stream in presentation
+    order and seek_time is None for the first segment. Short videos come back
+    as a single segment.
+    """
+    if not frames:
+        return None
+    duration = frames[-1][0] - frames[0][0]
+    count = min(workers, int(duration // min_segment_seconds))
+    keyframes = [i for i, (_, is_key) in enumerate(frames) if is_key and i > 0]
+    if count < 2 or not keyframes:
+        return [(0, len(frames), None)]
+
+    boundaries = [0]
+    for k in range(1, count):
+        target = k * len(frames) // count
+        # First keyframe at or after the ideal split point.
+        index = bisect.bisect_left(keyframes, target)
+        if index < len(keyframes) and keyframes[index] > boundaries[-1]:
+            boundaries.append(keyframes[index])
+    boundaries.append(len(frames))
+
+    segments = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        seek_time = None
+        if start > 0:
+            # Seek halfway between the previous frame and the keyframe, so
+            # rounding in the printed timestamps can never drop the keyframe.
+            seek_time = (frames[start - 1][0] + frames[start][0]) / 2
+        segments.append((start, end, seek_time))
+    return segments
+
+def segment_args(file_path, frame_interval, segment, output_pattern):
+    # Frames are selected by their global index (n + start) and numbered from
+    # the count of frames selected before this segment, so the _%04d sequence
+    # is the same as a single-pass run.
+    start, end, seek_time = segment
+    first_number = -(-start // frame_interval)
+    selected = -(-end // frame_interval) - first_number
+    args = []
+    if seek_time is not None:
+        # Probe timestamps are absolute, so don't offset them by the start time.
+        args.extend(["-seek_timestamp", "1", "-ss", f"{seek_time:.6f}"])
+    args.extend([
+        "-i", file_path, "-vf", f"select=not(mod(n+{start}\\,{frame_interval})),setpts=N/TB",
+        "-vsync", "vfr", "-frames:v", str(selected), "-start_number", str(first_number + 1), output_pattern
+    ])
+    return args
@@ -1,20 +1,15 @@
 # tabs/audio_tab.py
-import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
-from queue import Queue, Empty
-import subprocess
-from datetime import datetime
-from tkinterdnd2 import DND_FILES
-from utils.helpers import ensure_output_dir, update_status_label, find_files_in_folder
+from tkinter import ttk
+from utils.parallel import default_worker_count
+from tabs.common import setup_drop_target, submit_files
+from engine.audio import AUDIO_FORMATS, EXTENSIONS, convert_audio_result, parse_targets
 
 def setup(tab, app):
     ttk.Label(tab, text="Drag and drop audio files or folders here for processing.").pack(pady=10)
     ttk.Label(tab, text="Select Output Format:").pack()
     audio_format_var = tk.StringVar(value="mp3")
-    audio_formats = ["mp3", "wav", "flac", "m4a", "aac", "ogg", "wma"]
-    for fmt in audio_formats:
+    for fmt in AUDIO_FORMATS:
         ttk.Radiobutton(tab, text=fmt.upper(), variable=audio_format_var, value=fmt).pack()
     bitrate_var = tk.IntVar(value=128)
     ttk.Label(tab, text="Select MP3 Bitrate (kbps):").pack()
@@ -25,85 +20,48 @@ def setup(tab, app):
     # Mono conversion checkbox
     mono_var = tk.BooleanVar(value=False)
     ttk.Checkbutton(tab, text="Convert to Mono", variable=mono_var).pack(pady=5)
-    
-    drop_area = create_drop_area(tab)
-    drop_area.bind("<Enter>", lambda event: drop_area.config(bg="lightgreen"))
-    drop_area.bind("<Leave>", lambda event: drop_area.config(bg="darkgray"))
-    drop_area.config(bg="darkgray")  # Initial color when mouse is not hovering
-
-    drop_area.dnd_bind('<<Drop>>', lambda event: handle_audio_drop(event, app, audio_format_var, bitrate_var, mono_var, app.status_label, app.queue))
-    app.root.after(100, lambda: process_queue(app, app.queue, app.status_label))
-
-def create_drop_area(parent):
-    drop_area = tk.Text(parent, width=40, height=10, bg="lightgray")
-    drop_area.insert(tk.END, "Drop your audio files here")
-    drop_area.config(state=tk.DISABLED)
-    drop_area.pack(pady=20)
-    drop_area.drop_target_register(DND_FILES)
-    return drop_area
-
-def handle_audio_drop(event, app, audio_format_var, bitrate_var, mono_var, status_label, queue):
-    paths = app.root.tk.splitlist(event.data)
-    audio_files = []
-    for path in paths:
-        if os.path.isdir(path):
-            audio_files.extend(find_files_in_folder(path, valid_extensions=[".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg", ".wma"]))
-        elif os.path.isfile(path) and path.lower().endswith(('.mp3', '.wav', '.flac', '.m4a', '.aac', '.ogg', '.wma')):
-            audio_files.append(path)
-    
-    if not audio_files:
-        messagebox.showerror("Error", "No valid audio files were found")
-        return
 
-    app.start_progress()
-    status_label.config(text="Processing audio files...")
-    t = threading.Thread(target=process_dropped_files, args=(audio_files, audio_format_var, bitrate_var, mono_var, queue))
-    t.start()
+    stream_copy_var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(tab, text="Stream-copy sources that already match", variable=stream_copy_var).pack(pady=5)
 
-def process_dropped_files(files, audio_format_var, bitrate_var, mono_var, queue):
-    for file in files:
-        try:
-            process_audio_file(file, audio_format_var.get(), bitrate_var.get(), mono_var.get(), queue)
-        except Exception as e:
-            queue.put((file, str(e)))
+    ttk.Label(tab, text="Fan-out targets, decoded once (e.g. mp3@128, mp3@320, flac, wav/mono):").pack()
+    targets_var = tk.StringVar(value="")
+    ttk.Entry(tab, textvariable=targets_var, width=40).pack()
 
-def process_queue(app, queue, status_label):
-    try:
-        while True:
-            msg = queue.get_nowait()
-            update_status_label(status_label, msg[1])
-            app.stop_progress()
-    except Empty:
-        app.root.after(100, lambda: process_queue(app, queue, status_label))
+    ttk.Label(tab, text="Concurrent conversions:").pack()
+    workers_var = tk.IntVar(value=default_worker_count())
+    ttk.Spinbox(tab, from_=1, to=default_worker_count() * 2, textvariable=workers_var, width=5).pack()
+    ttk.Label(tab, text="Timeout per file (seconds, 0 = none):").pack()
+    timeout_var = tk.IntVar(value=0)
+    ttk.Spinbox(tab, from_=0, to=86400, increment=60, textvariable=timeout_var, width=7).pack()
 
-def get_timestamped_suffix():
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+    settings = {
+        "format": audio_format_var,
+        "bitrate": bitrate_var,
+        "mono": mono_var,
+        "targets": targets_var,
+        "stream_copy": stream_copy_var,
+        "workers": workers_var,
+        "timeout": timeout_var,
+    }
+    ttk.Button(tab, text="Cancel", command=lambda: app.scheduler.cancel_tab("audio")).pack(pady=5)
+    setup_drop_target(tab, app, "audio", EXTENSIONS, settings, build_options, submit_audio_files)
 
-def generate_unique_file_path(output_folder, base_name, output_format, bitrate):
-    suffix = f"_{bitrate}kbps"
-    potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}.{output_format}")
-    counter = 1
-    while os.path.exists(potential_file_path):
-        padded_counter = f"{counter:03}"
-        potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}_{padded_counter}.{output_format}")
-        counter += 1
-    return potential_file_path
+def build_options(values):
+    bitrate = values["bitrate"]
+    targets = parse_targets(values["targets"], bitrate)
+    if not targets:
+        targets = [(values["format"], bitrate, values["mono"])]
+    return {
+        "targets": targets,
+        "stream_copy": values["stream_copy"],
+        "workers": max(1, values["workers"]),
+        "timeout": values["timeout"] or None,
+    }
 
-def process_audio_file(file_path, output_format, bitrate, convert_to_mono, queue):
-    try:
-        output_bitrate = f"{bitrate}k"
-        base_name, ext = os.path.splitext(os.path.basename(file_path))
-        output_folder = os.path.join(os.path.dirname(file_path), "output")
-        ensure_output_dir(output_folder)
-        output_file = generate_unique_file_path(output_folder, base_name, output_format, bitrate)
-        ffmpeg_cmd = ["ffmpeg", "-i", file_path]
-        if convert_to_mono:
-            ffmpeg_cmd.extend(["-ac", "1"])
-        if output_format == "mp3":
-            ffmpeg_cmd.extend(["-b:a", output_bitrate, output_file])
-        else:
-            ffmpeg_cmd.append(output_file)
-        subprocess.run(ffmpeg_cmd, check=True)
-        queue.put((file_path, f"Audio saved to: {output_file}"))
-    except subprocess.CalledProcessError as e:
-        queue.put((file_path, f"Error: {str(e)}"))
\ No newline at end of file
+def submit_audio_files(app, paths, options):
+    # ffmpeg does the work in child processes; each scheduler slot keeps one running.
+    submit_files(app, "audio", paths, EXTENSIONS, options,
+                 lambda file, batch, journal: convert_audio_result(file, options["targets"], options["timeout"],
+                                                                   batch.cancel_event, options["stream_copy"]),
+                 max_concurrency=options["workers"])
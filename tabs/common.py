@@ -0,0 +1,62 @@
+# tabs/common.py
+
+import tkinter as tk
+from tkinter import messagebox
+from tkinterdnd2 import DND_FILES
+from utils.helpers import iter_input_files
+
+def setup_drop_target(tab, app, name, extensions, settings, build_options, submit):
+    """Add the drop area and the watch-folder controls to a tab.
+
+    settings maps option names to the tab's Tk variables (or dicts of them).
+    When files are dropped or a watch starts, the variables are read into
+    plain values and build_options(values) turns them into the options of a
+    batch; a ValueError from it is shown instead of starting anything.
+    submit(app, paths, options) then queues the dropped paths, or each list
+    of files a watched folder reports.
+    """
+    drop_area = tk.Text(tab, width=40, height=10, bg="lightgray")
+    drop_area.insert(tk.END, f"Drop your {name} files here")
+    drop_area.config(state=tk.DISABLED)
+    drop_area.pack(pady=20)
+    drop_area.drop_target_register(DND_FILES)
+    drop_area.bind("<Enter>", lambda event: drop_area.config(bg="lightgreen"))
+    drop_area.bind("<Leave>", lambda event: drop_area.config(bg="darkgray"))
+    drop_area.config(bg="darkgray")  # Initial color when mouse is not hovering
+
+    def handle_drop(event):
+        options = checked_options(settings, build_options)
+        if options is None:
+            return
+        app.status_label.config(text=f"Processing {name} files...")
+        submit(app, app.root.tk.splitlist(event.data), options)
+
+    def make_submitter():
+        options = checked_options(settings, build_options)
+        if options is None:
+            return None
+        return lambda files: submit(app, files, options)
+
+    drop_area.dnd_bind('<<Drop>>', handle_drop)
+    app.create_watch_controls(tab, name, extensions, make_submitter)
+
+def read_values(settings):
+    return {key: read_values(var) if isinstance(var, dict) else var.get() for key, var in settings.items()}
+
+def checked_options(settings, build_options):
+    try:
+        return build_options(read_values(settings))
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return None
+
+def submit_files(app, tab, paths, extensions, options, job, **kwargs):
+    """Queue job(file, batch, journal) for every matching file in paths.
+
+    Folders are scanned by the scheduler's feeder thread while the first
+    files are processed. Files an earlier run finished with the same options
+    are skipped, and results go through the batch's journal.
+    """
+    journal = app.journal(tab, options)
+    return app.submit_batch(tab, journal.pending(iter_input_files(paths, extensions)),
+                            lambda file, batch: job(file, batch, journal), queue=journal, **kwargs)
@@ -1,14 +1,11 @@
 # tabs/image_tab.py
 
-import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageEnhance
-import threading
-from queue import Queue, Empty
-from tkinterdnd2 import DND_FILES
-from utils.helpers import ensure_output_dir, update_status_label, find_files_in_folder
-from datetime import datetime
+from tkinter import ttk
+from utils.parallel import default_worker_count
+from tabs.common import setup_drop_target, submit_files
+from utils import tracing
+from engine.image import ENCODER_PROFILES, EXTENSIONS, OUTPUT_FORMATS, process_image_job, report_batch
 
 def setup(tab, app):
     ttk.Label(tab, text="Drag and drop images or folders here for processing.").pack(pady=10)
@@ -17,114 +14,75 @@ def setup(tab, app):
     resolutions = ["1024x1024", "768x768", "512x512"]
     for res in resolutions:
         ttk.Radiobutton(tab, text=res, variable=resolution_var, value=res).pack()
+    all_sizes = tk.BooleanVar(value=False)
+    ttk.Checkbutton(tab, text="Output all checked sizes from one decode", variable=all_sizes).pack()
+    size_vars = {}
+    for res in resolutions:
+        size_vars[res] = tk.BooleanVar(value=True)
+        ttk.Checkbutton(tab, text=f"Include {res}", variable=size_vars[res]).pack()
     add_margin = tk.BooleanVar(value=False)
     ttk.Checkbutton(tab, text="Add 16-pixel margin", variable=add_margin).pack()
-    
-    drop_area = create_drop_area(tab)
-    drop_area.bind("<Enter>", lambda event: drop_area.config(bg="lightgreen"))
-    drop_area.bind("<Leave>", lambda event: drop_area.config(bg="darkgray"))
-    drop_area.config(bg="darkgray")  # Initial color when mouse is not hovering
-
-    drop_area.dnd_bind('<<Drop>>', lambda event: handle_image_drop(event, app, resolution_var, add_margin, app.status_label, app.queue))
-    app.root.after(100, lambda: process_queue(app, app.queue, app.status_label))
-
-def create_drop_area(parent):
-    drop_area = tk.Text(parent, width=40, height=10, bg="lightgray")
-    drop_area.insert(tk.END, "Drop your image files here")
-    drop_area.config(state=tk.DISABLED)
-    drop_area.pack(pady=20)
-    drop_area.drop_target_register(DND_FILES)
-    return drop_area
-
-def handle_image_drop(event, app, resolution_var, add_margin, status_label, queue):
-    paths = app.root.tk.splitlist(event.data)
-    image_files = []
-    for path in paths:
-        if os.path.isdir(path):
-            image_files.extend(find_files_in_folder(path, valid_extensions=[".jpg", ".jpeg", ".png", ".bmp"]))
-        elif os.path.isfile(path) and path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')):
-            image_files.append(path)
 
-    if not image_files:
-        messagebox.showerror("Error", "No valid image files were found.")
-        return
-
-    app.start_progress()
-    status_label.config(text="Processing image files...")
-    t = threading.Thread(target=process_dropped_files, args=(image_files, resolution_var, add_margin, queue))
-    t.start()
-
-def process_dropped_files(files, resolution_var, add_margin, queue):
-    for file in files:
-        try:
-            process_image(file, resolution_var, add_margin, queue)
-        except Exception as e:
-            queue.put((file, str(e)))
-
-def process_queue(app, queue, status_label):
+    ttk.Label(tab, text="Output Format:").pack()
+    output_format_var = tk.StringVar(value="source")
+    ttk.Combobox(tab, textvariable=output_format_var, values=["source"] + list(OUTPUT_FORMATS), state="readonly", width=10).pack()
+    ttk.Label(tab, text="Encoder Profile:").pack()
+    profile_var = tk.StringVar(value="default")
+    for profile in ENCODER_PROFILES:
+        ttk.Radiobutton(tab, text=profile.capitalize(), variable=profile_var, value=profile).pack()
+
+    use_processes = tk.BooleanVar(value=False)
+    ttk.Checkbutton(tab, text="Use multiple processes", variable=use_processes).pack()
+    ttk.Label(tab, text="Worker processes:").pack()
+    workers_var = tk.IntVar(value=default_worker_count())
+    ttk.Spinbox(tab, from_=1, to=default_worker_count() * 2, textvariable=workers_var, width=5).pack()
+
+    settings = {
+        "resolution": resolution_var,
+        "all_sizes": all_sizes,
+        "sizes": size_vars,
+        "add_margin": add_margin,
+        "output_format": output_format_var,
+        "profile": profile_var,
+        "use_processes": use_processes,
+        "workers": workers_var,
+    }
+    setup_drop_target(tab, app, "image", EXTENSIONS, settings, build_options, submit_image_files)
+
+def build_options(values):
+    if values["all_sizes"]:
+        resolutions = [res for res, checked in values["sizes"].items() if checked]
+    else:
+        resolutions = [values["resolution"]]
+    if not resolutions:
+        raise ValueError("Select at least one size.")
+    output_format = values["output_format"]
+    return {
+        "resolutions": resolutions,
+        "add_margin": values["add_margin"],
+        "output_format": None if output_format == "source" else output_format,
+        "profile": values["profile"],
+        "workers": values["workers"] if values["use_processes"] else 1,
+        "write_manifest": values["all_sizes"],
+    }
+
+def submit_image_files(app, paths, options):
+    # Without worker processes, two files in flight let one decode while the
+    # other encodes, as pipelined_results does; Pillow releases the GIL for both.
+    submit_files(app, "image", paths, EXTENSIONS, options,
+                 lambda file, batch, journal: scheduled_image_job(app.scheduler, file, options),
+                 max_concurrency=max(2, options["workers"]),
+                 on_done=lambda batch, results: report_batch(results, options, app.queue))
+
+def scheduled_image_job(scheduler, file_path, options):
+    args = (file_path, options["resolutions"], options["add_margin"], options.get("output_format"), options.get("profile", "default"))
+    if options.get("workers", 1) <= 1:
+        return process_image_job(*args)
     try:
-        while True:
-            msg = queue.get_nowait()
-            update_status_label(status_label, msg[1])
-            app.stop_progress()
-    except Empty:
-        app.root.after(100, lambda: process_queue(app, queue, status_label))
-
-def get_timestamped_suffix():
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
-
-def generate_unique_file_path(output_folder, base_name, suffix, ext):
-    potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}.{ext}")
-    counter = 1
-    while os.path.exists(potential_file_path):
-        padded_counter = f"{counter:03}"
-        potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}_{padded_counter}.{ext}")
-        counter += 1
-    return potential_file_path
-
-def process_image(file_path, resolution_var, add_margin, queue):
-    try:
-        img = Image.open(file_path)
-        base_name, ext = os.path.splitext(os.path.basename(file_path))
-        suffix = ""
-        
-        img = crop_to_square(img)
-        img = resize_image(img, resolution_var.get())
-        suffix += f"_resized_{resolution_var.get()}"
-        
-        if add_margin.get():
-            img = add_image_inner_margin(img)
-            suffix += "_margin"
-        
-        img = sharpen_image(img)
-        suffix += "_sharpened"
-        
-        output_folder = os.path.join(os.path.dirname(file_path), "output")
-        ensure_output_dir(output_folder)
-        output_file = generate_unique_file_path(output_folder, base_name, suffix, ext[1:])
-        img.save(output_file)
-        queue.put((file_path, f"Image saved to: {output_file}"))
+        if tracing.enabled():
+            result, events = scheduler.run_in_process(tracing.call_traced, process_image_job, *args)
+            tracing.merge(events)
+            return result
+        return scheduler.run_in_process(process_image_job, *args)
     except Exception as e:
-        queue.put((file_path, f"Error: {str(e)}"))
-
-def crop_to_square(img):
-    width, height = img.size
-    min_side = min(width, height)
-    left = (width - min_side) // 2
-    top = (height - min_side) // 2
-    return img.crop((left, top, width - left, height - top))
-
-def resize_image(img, resolution):
-    new_size = tuple(map(int, resolution.split("x")))
-    return img.resize(new_size, Image.LANCZOS)
-
-def add_image_inner_margin(img):
-    margin = 16
-    width, height = img.size
-    new_img = Image.new("RGB", (width, height), (255, 255, 255))
-    new_img.paste(img.crop((margin, margin, width - margin, height - margin)), (margin, margin))
-    return new_img
-
-def sharpen_image(img):
-    enhancer = ImageEnhance.Sharpness(img)
-    return enhancer.enhance(1.5)
\ No newline at end of file
+        return (file_path, f"Error: {e!r}", [], [])
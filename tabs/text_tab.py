@@ -1,13 +1,11 @@
 # tabs/text_tab.py
 
-import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
-from queue import Queue, Empty
-from datetime import datetime
-from tkinterdnd2 import DND_FILES
-from utils.helpers import ensure_output_dir, update_status_label, find_files_in_folder
+from tkinter import ttk
+from utils.helpers import iter_input_files
+from utils.parallel import default_worker_count
+from tabs.common import setup_drop_target, submit_files
+from engine.text import EXTENSIONS, process_dropped_files, process_text_options
 
 def setup(tab, app):
     ttk.Label(tab, text="Drag and drop text files or folders here for processing.").pack(pady=10)
@@ -15,120 +13,56 @@ def setup(tab, app):
     deduplicate_var = tk.BooleanVar(value=False)
     ttk.Checkbutton(tab, text="Merge Files", variable=merge_var).pack(pady=5)
     ttk.Checkbutton(tab, text="Deduplicate Words", variable=deduplicate_var).pack(pady=5)
-    
-    drop_area = create_drop_area(tab)
-    drop_area.bind("<Enter>", lambda event: drop_area.config(bg="lightgreen"))
-    drop_area.bind("<Leave>", lambda event: drop_area.config(bg="darkgray"))
-    drop_area.config(bg="darkgray")  # Initial color when mouse is not hovering
+    compact_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(tab, text="Compact word index (hashed digests)", variable=compact_var).pack()
+    ttk.Label(tab, text="Dedup memory budget (MB):").pack()
+    memory_budget_var = tk.IntVar(value=256)
+    ttk.Spinbox(tab, from_=16, to=65536, increment=64, textvariable=memory_budget_var, width=7).pack()
 
-    drop_area.dnd_bind('<<Drop>>', lambda event: handle_text_drop(event, app, merge_var, deduplicate_var, app.status_label, app.queue))
-    app.root.after(100, lambda: process_queue(app, app.queue, app.status_label))
+    corpus_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(tab, text="Deduplicate across all dropped files (corpus)", variable=corpus_var).pack(pady=5)
+    unit_var = tk.StringVar(value="words")
+    ttk.Radiobutton(tab, text="Words", variable=unit_var, value="words").pack()
+    ttk.Radiobutton(tab, text="Lines", variable=unit_var, value="lines").pack()
+    ttk.Label(tab, text="Corpus worker processes:").pack()
+    workers_var = tk.IntVar(value=default_worker_count())
+    ttk.Spinbox(tab, from_=1, to=default_worker_count() * 2, textvariable=workers_var, width=5).pack()
 
-def create_drop_area(parent):
-    drop_area = tk.Text(parent, width=40, height=10, bg="lightgray")
-    drop_area.insert(tk.END, "Drop your text files here")
-    drop_area.config(state=tk.DISABLED)
-    drop_area.pack(pady=20)
-    drop_area.drop_target_register(DND_FILES)
-    return drop_area
+    settings = {
+        "merge": merge_var,
+        "deduplicate": deduplicate_var,
+        "compact": compact_var,
+        "memory_budget": memory_budget_var,
+        "corpus": corpus_var,
+        "unit": unit_var,
+        "workers": workers_var,
+    }
+    setup_drop_target(tab, app, "text", EXTENSIONS, settings, build_options, submit_text_paths)
 
-def handle_text_drop(event, app, merge_var, deduplicate_var, status_label, queue):
-    paths = app.root.tk.splitlist(event.data)
-    text_files = []
-    for path in paths:
-        if os.path.isdir(path):
-            text_files.extend(find_files_in_folder(path, valid_extensions=[".txt"]))
-        elif os.path.isfile(path) and path.endswith('.txt'):
-            text_files.append(path)
-            
-    if not text_files:
-        messagebox.showerror("Error", "No valid text files were found.")
-        return
-
-    app.start_progress()
-    status_label.config(text="Processing text files...")
-    t = threading.Thread(target=process_dropped_files, args=(text_files, merge_var, deduplicate_var, queue))
-    t.start()
-
-def process_dropped_files(files, merge_var, deduplicate_var, queue):
-    output_files = []
-    for file in files:
-        try:
-            if merge_var.get():
-                merge_text_files(files, queue)
-                return
-            elif deduplicate_var.get():
-                output_files.append(deduplicate_text_files(file, queue))
-            else:
-                output_files.append(process_text_file(file, queue))
-        except Exception as e:
-            queue.put((file, str(e)))
-
-def process_queue(app, queue, status_label):
-    try:
-        while True:
-            msg = queue.get_nowait()
-            update_status_label(status_label, msg[1])
-            app.stop_progress()
-    except Empty:
-        app.root.after(100, lambda: process_queue(app, queue, status_label))
+def build_options(values):
+    return {
+        "merge": values["merge"],
+        "deduplicate": values["deduplicate"],
+        "compact": values["compact"],
+        "memory_budget": values["memory_budget"] * 2 ** 20,
+        "corpus": values["corpus"],
+        "unit": values["unit"],
+        "workers": max(1, values["workers"]),
+    }
 
-def get_timestamped_suffix():
-    return datetime.now().strftime("%Y%m%d_%H%M%S")
+def submit_text_paths(app, paths, options):
+    if options["corpus"] or options["merge"]:
+        # Corpus dedup and merging work on the whole batch, so they are one job
+        # that scans the dropped folders itself, off the UI thread. Corpus
+        # dedup runs `workers` processes of its own.
+        app.submit_batch("text", [paths], lambda paths, batch: process_whole_batch(paths, options, app.queue),
+                         max_concurrency=1, slots=options["workers"] if options["corpus"] else 1)
+    else:
+        submit_files(app, "text", paths, EXTENSIONS, options,
+                     lambda file, batch, journal: process_text_options(file, options, journal))
 
-def generate_unique_file_path(output_folder, base_name, suffix, ext):
-    potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}.{ext}")
-    counter = 1
-    while os.path.exists(potential_file_path):
-        padded_counter = f"{counter:03}"
-        potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}_{padded_counter}.{ext}")
-        counter += 1
-    return potential_file_path
-
-def process_text_file(file_path, queue):
-    try:
-        base_name, ext = os.path.splitext(os.path.basename(file_path))
-        output_folder = os.path.join(os.path.dirname(file_path), "output")
-        ensure_output_dir(output_folder)
-        output_file = generate_unique_file_path(output_folder, base_name, "", ext[1:])
-        with open(file_path, 'r') as infile, open(output_file, 'w') as outfile:
-            for line in infile:
-                outfile.write(line)
-        queue.put((file_path, f"Text file saved to: {output_file}"))
-        return output_file
-    except Exception as e:
-        queue.put((file_path, str(e)))
-    
-def merge_text_files(file_paths, queue):
-    try:
-        base_name = "merged"
-        ext = "txt"
-        output_folder = os.path.join(os.path.dirname(file_paths[0]), "output")
-        ensure_output_dir(output_folder)
-        output_file = generate_unique_file_path(output_folder, base_name, "", ext)
-        with open(output_file, 'w') as outfile:
-            for i, file_path in enumerate(file_paths):
-                with open(file_path, 'r') as infile:
-                    outfile.write(infile.read())
-                    if i < len(file_paths) - 1:
-                        outfile.write("\n---\n")
-        queue.put((file_paths[0], f"Text files merged and saved to: {output_file}"))
-    except Exception as e:
-        queue.put((file_paths[0], str(e)))
-
-def deduplicate_text_files(file_path, queue):
-    try:
-        base_name, ext = os.path.splitext(os.path.basename(file_path))
-        output_folder = os.path.join(os.path.dirname(file_path), "output")
-        ensure_output_dir(output_folder)
-        output_file = generate_unique_file_path(output_folder, base_name, "_deduplicated", ext[1:])
-        unique_words = set()
-        with open(file_path, 'r') as infile, open(output_file, 'w') as outfile:
-            for word in infile.read().split():
-                if word not in unique_words:
-                    outfile.write(f"{word} ")
-                    unique_words.add(word)
-        queue.put((file_path, f"Duplicate words removed, file saved to: {output_file}"))
-        return output_file
-    except Exception as e:
-        queue.put((file_path, str(e)))
\ No newline at end of file
+def process_whole_batch(paths, options, queue):
+    text_files = list(iter_input_files(paths, EXTENSIONS))
+    if not text_files:
+        return ("text", "No valid text files were found.")
+    process_dropped_files(text_files, options, queue)
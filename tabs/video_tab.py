@@ -1,13 +1,10 @@
 # tabs/video_tab.py
 
-import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
-from queue import Queue, Empty
-import subprocess
-from tkinterdnd2 import DND_FILES
-from utils.helpers import ensure_output_dir, update_status_label, find_files_in_folder
+from tkinter import ttk
+from utils.parallel import default_worker_count
+from tabs.common import setup_drop_target, submit_files
+from engine.video import DEDUP_FILTERS, EXTENSIONS, SAMPLING_MODES, check_options, process_video_options
 
 def setup(tab, app):
     ttk.Label(tab, text="Drag and drop video files or folders here for processing.").pack(pady=10)
@@ -16,76 +13,71 @@ def setup(tab, app):
     frame_options = [1, 2, 3, 4, 5]
     for interval in frame_options:
         ttk.Radiobutton(tab, text=f"Every {interval} frame", variable=frame_interval_var, value=interval).pack()
-    
-    drop_area = create_drop_area(tab)
-    drop_area.bind("<Enter>", lambda event: drop_area.config(bg="lightgreen"))
-    drop_area.bind("<Leave>", lambda event: drop_area.config(bg="darkgray"))
-    drop_area.config(bg="darkgray")  # Initial color when mouse is not hovering
-    
-    drop_area.dnd_bind('<<Drop>>', lambda event: handle_video_drop(event, app, frame_interval_var, app.status_label, app.queue))
-    app.root.after(100, lambda: process_queue(app, app.queue, app.status_label))
 
-def create_drop_area(parent):
-    drop_area = tk.Text(parent, width=40, height=10, bg="lightgray")
-    drop_area.insert(tk.END, "Drop your video files here")
-    drop_area.config(state=tk.DISABLED)
-    drop_area.pack(pady=20)
-    drop_area.drop_target_register(DND_FILES)
-    return drop_area
+    ttk.Label(tab, text="Sampling mode:").pack()
+    mode_var = tk.StringVar(value="nth")
+    for mode, label in SAMPLING_MODES.items():
+        ttk.Radiobutton(tab, text=label, variable=mode_var, value=mode).pack()
+    ttk.Label(tab, text="Seconds between frames:").pack()
+    interval_seconds_var = tk.DoubleVar(value=1.0)
+    ttk.Spinbox(tab, from_=0.1, to=3600, increment=1, textvariable=interval_seconds_var, width=7).pack()
+    ttk.Label(tab, text="Total number of frames:").pack()
+    frame_count_var = tk.IntVar(value=100)
+    ttk.Spinbox(tab, from_=1, to=100000, textvariable=frame_count_var, width=7).pack()
 
-def handle_video_drop(event, app, frame_interval_var, status_label, queue):
-    paths = app.root.tk.splitlist(event.data)
-    video_files = []
-    for path in paths:
-        if os.path.isdir(path):
-            video_files.extend(find_files_in_folder(path, valid_extensions=[".mp4", ".avi", ".mov", ".mkv"]))
-        elif os.path.isfile(path) and path.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
-            video_files.append(path)
-    
-    if not video_files:
-        messagebox.showerror("Error", "No valid video files were found.")
-        return
+    ttk.Label(tab, text="Drop near-duplicate frames:").pack()
+    dedup_var = tk.StringVar(value="off")
+    ttk.Combobox(tab, textvariable=dedup_var, values=["off"] + list(DEDUP_FILTERS), state="readonly", width=10).pack()
+    ttk.Label(tab, text="Scene-change threshold (0-1):").pack()
+    dedup_threshold_var = tk.DoubleVar(value=0.03)
+    ttk.Spinbox(tab, from_=0.0, to=1.0, increment=0.01, textvariable=dedup_threshold_var, width=7).pack()
 
-    app.start_progress()
-    status_label.config(text="Processing video files...")
-    t = threading.Thread(target=process_dropped_files, args=(video_files, frame_interval_var, queue))
-    t.start()
+    ttk.Label(tab, text="Output:").pack()
+    output_var = tk.StringVar(value="frames")
+    ttk.Radiobutton(tab, text="PNG frames", variable=output_var, value="frames").pack()
+    ttk.Radiobutton(tab, text="Training crops (streamed, no temporary PNGs)", variable=output_var, value="crops").pack()
+    crop_resolution_var = tk.StringVar(value="512x512")
+    ttk.Combobox(tab, textvariable=crop_resolution_var, values=["1024x1024", "768x768", "512x512"], state="readonly",
+                 width=10).pack()
+    crop_margin_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(tab, text="Add 16-pixel margin to crops", variable=crop_margin_var).pack()
 
-def process_dropped_files(files, frame_interval_var, queue):
-    for file in files:
-        try:
-            process_video_file(file, frame_interval_var.get(), queue)
-        except Exception as e:
-            queue.put((file, str(e)))
+    ttk.Label(tab, text="Parallel ffmpeg workers:").pack()
+    workers_var = tk.IntVar(value=default_worker_count())
+    ttk.Spinbox(tab, from_=1, to=default_worker_count() * 2, textvariable=workers_var, width=5).pack()
 
-def process_queue(app, queue, status_label):
-    try:
-        while True:
-            msg = queue.get_nowait()
-            update_status_label(status_label, msg[1])
-            app.stop_progress()
-    except Empty:
-        app.root.after(100, lambda: process_queue(app, queue, status_label))
+    settings = {
+        "frame_interval": frame_interval_var,
+        "mode": mode_var,
+        "interval_seconds": interval_seconds_var,
+        "frame_count": frame_count_var,
+        "dedup": dedup_var,
+        "dedup_threshold": dedup_threshold_var,
+        "output": output_var,
+        "crop_resolution": crop_resolution_var,
+        "crop_margin": crop_margin_var,
+        "workers": workers_var,
+    }
+    setup_drop_target(tab, app, "video", EXTENSIONS, settings, build_options, submit_video_files)
 
-def generate_unique_file_path(output_folder, base_name, suffix, ext, frame_num):
-    padded_counter = f"{frame_num:04}"
-    potential_file_path = os.path.join(output_folder, f"{base_name}{suffix}_{padded_counter}.{ext}")
-    return potential_file_path
+def build_options(values):
+    options = {
+        "frame_interval": values["frame_interval"],
+        "mode": values["mode"],
+        "interval_seconds": values["interval_seconds"],
+        "frame_count": values["frame_count"],
+        "dedup": None if values["dedup"] == "off" else values["dedup"],
+        "dedup_threshold": values["dedup_threshold"],
+        "output": values["output"],
+        "crop_resolution": values["crop_resolution"],
+        "crop_margin": values["crop_margin"],
+        "workers": max(1, values["workers"]),
+    }
+    check_options(options)
+    return options
 
-def process_video_file(file_path, frame_interval, queue):
-    try:
-        base_name, ext = os.path.splitext(os.path.basename(file_path))
-        output_folder = os.path.join(os.path.dirname(file_path), "output", "frames")
-        ensure_output_dir(output_folder)
-
-        # Use ffmpeg to extract frames with padded file names
-        ffmpeg_cmd = [
-            "ffmpeg", "-i", file_path, "-vf", f"select=not(mod(n\\,{frame_interval})),setpts=N/TB", 
-            "-vsync", "vfr", os.path.join(output_folder, f"{base_name}_%04d.png")
-        ]
-        subprocess.run(ffmpeg_cmd, check=True)
-        queue.put((file_path, f"Frames extracted to: {output_folder}"))
-    except subprocess.CalledProcessError as e:
-        queue.put((file_path, str(e)))
-    except Exception as err:
-        queue.put((file_path, f"Unexpected error: {str(err)}"))
\ No newline at end of file
+def submit_video_files(app, paths, options):
+    # Each file runs up to `workers` ffmpeg processes (or crop threads), so it takes that many slots.
+    submit_files(app, "video", paths, EXTENSIONS, options,
+                 lambda file, batch, journal: process_video_options(file, options, journal, batch.cancel_event),
+                 slots=options["workers"])
@@ -0,0 +1,31 @@
+from utils.corpus_dedup import dedupe_corpus
+
+def corpus(tmp_path, texts):
+    files, outputs = [], []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(text)
+        files.append(str(path))
+        outputs.append(str(tmp_path / f"{i}_out.txt"))
+    return files, outputs
+
+def test_first_file_keeps_each_word(tmp_path):
+    files, outputs = corpus(tmp_path, ["a b a c", "c d b", "e a"])
+    results = list(dedupe_corpus(files, outputs, "words", workers=2, temp_dir=str(tmp_path)))
+    assert [result[1:] for result in results] == [(4, 3, None), (3, 1, None), (2, 1, None)]
+    assert [open(path).read().split() for path in outputs] == [["a", "b", "c"], ["d"], ["e"]]
+
+def test_lines_are_compared_whole(tmp_path):
+    files, outputs = corpus(tmp_path, ["one line\nother line\none line\n", "other line\nnew line\n"])
+    results = list(dedupe_corpus(files, outputs, "lines", workers=2, temp_dir=str(tmp_path)))
+    assert [result[1:] for result in results] == [(3, 2, None), (2, 1, None)]
+    assert [open(path).read().splitlines() for path in outputs] == [["one line", "other line"], ["new line"]]
+
+def test_unreadable_files_fail_alone(tmp_path):
+    files, outputs = corpus(tmp_path, ["a b", "b c"])
+    files.insert(1, str(tmp_path / "missing.txt"))
+    outputs.insert(1, str(tmp_path / "missing_out.txt"))
+    results = list(dedupe_corpus(files, outputs, "words", workers=2, temp_dir=str(tmp_path)))
+    assert results[1][0] == files[1] and isinstance(results[1][3], FileNotFoundError)
+    assert [result[1:3] for result in results] == [(2, 2), (0, 0), (2, 1)]
+    assert open(outputs[2]).read().split() == ["c"]
@@ -0,0 +1,89 @@
+import os
+import errno
+import pytest
+from utils import fastcopy
+from utils.fastcopy import copy_file, merge_files
+
+needs_kernel_copy = pytest.mark.skipif(not hasattr(os, "copy_file_range") or not hasattr(os, "sendfile"),
+                                       reason="needs copy_file_range and sendfile")
+
+def unusable(*args):
+    raise OSError(errno.EXDEV, "cross-device")
+
+def counting(func, calls, name):
+    def wrapper(*args):
+        calls.append(name)
+        return func(*args)
+    return wrapper
+
+def source(tmp_path, data=bytes(range(256)) * 1000):
+    path = tmp_path / "in.bin"
+    path.write_bytes(data)
+    return path, data
+
+@needs_kernel_copy
+def test_falls_back_to_sendfile(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(fastcopy.os, "copy_file_range", unusable)
+    monkeypatch.setattr(fastcopy.os, "sendfile", counting(os.sendfile, calls, "sendfile"))
+    path, data = source(tmp_path)
+    copy_file(str(path), str(tmp_path / "out.bin"))
+    assert (tmp_path / "out.bin").read_bytes() == data
+    assert calls
+
+@needs_kernel_copy
+def test_falls_back_to_read_and_write(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(fastcopy.os, "copy_file_range", unusable)
+    monkeypatch.setattr(fastcopy.os, "sendfile", unusable)
+    monkeypatch.setattr(fastcopy.os, "read", counting(os.read, calls, "read"))
+    monkeypatch.setattr(fastcopy, "BUFFER_SIZE", 4096)
+    path, data = source(tmp_path)
+    copy_file(str(path), str(tmp_path / "out.bin"))
+    assert (tmp_path / "out.bin").read_bytes() == data
+    assert len(calls) >= len(data) // 4096
+
+@needs_kernel_copy
+def test_fallback_continues_where_the_failed_method_stopped(tmp_path, monkeypatch):
+    # copy_file_range copies the first chunk, then stops being usable.
+    real = os.copy_file_range
+    calls = []
+    def first_chunk_only(src_fd, dst_fd, count):
+        calls.append(count)
+        if len(calls) > 1:
+            unusable()
+        return real(src_fd, dst_fd, count)
+    monkeypatch.setattr(fastcopy.os, "copy_file_range", first_chunk_only)
+    monkeypatch.setattr(fastcopy, "COPY_CHUNK", 1000)
+    path, data = source(tmp_path)
+    copy_file(str(path), str(tmp_path / "out.bin"))
+    assert (tmp_path / "out.bin").read_bytes() == data
+    assert len(calls) == 2
+
+@needs_kernel_copy
+def test_real_errors_are_raised(tmp_path, monkeypatch):
+    def failing(*args):
+        raise OSError(errno.EIO, "I/O error")
+    monkeypatch.setattr(fastcopy.os, "copy_file_range", failing)
+    path, _ = source(tmp_path)
+    with pytest.raises(OSError) as info:
+        copy_file(str(path), str(tmp_path / "out.bin"))
+    assert info.value.errno == errno.EIO
+
+def test_merge_puts_separators_only_between_files(tmp_path):
+    parts = [b"first", b"", b"third\n"]
+    paths = []
+    for i, data in enumerate(parts):
+        paths.append(tmp_path / f"{i}.txt")
+        paths[-1].write_bytes(data)
+    written = merge_files([str(path) for path in paths], str(tmp_path / "out.txt"))
+    expected = b"\n---\n".join(parts)
+    assert (tmp_path / "out.txt").read_bytes() == expected
+    assert written == len(expected)
+
+def test_merge_without_separator_replaces_older_content(tmp_path):
+    (tmp_path / "out.txt").write_bytes(b"x" * 100)
+    (tmp_path / "a.txt").write_bytes(b"ab")
+    (tmp_path / "b.txt").write_bytes(b"cd")
+    merge_files([str(tmp_path / "a.txt"), str(tmp_path / "b.txt")], str(tmp_path / "out.txt"), separator=b"")
+    assert (tmp_path / "out.txt").read_bytes() == b"abcd"
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+from utils.journal import JOURNAL_NAME, BatchJournal, Journal
+
+class Collect(list):
+    put = list.append
+
+def run(tmp_path, sources, make_message):
+    collected = Collect()
+    journal = BatchJournal("text", {"mode": "copy"}, collected)
+    for source in journal.pending([str(path) for path in sources]):
+        journal.put(make_message(source))
+    return journal, collected
+
+def copy_message(tmp_path):
+    def make(source):
+        output = tmp_path / "output" / ("out_" + os.path.basename(source))
+        output.parent.mkdir(exist_ok=True)
+        output.write_bytes(b"data")
+        return (source, f"Text file saved to: {output}", [str(output)])
+    return make
+
+def sources(tmp_path, count=3):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"{i}.txt"
+        path.write_bytes(b"source %d" % i)
+        paths.append(path)
+    return paths
+
+def test_files_with_their_outputs_are_skipped(tmp_path):
+    files = sources(tmp_path)
+    run(tmp_path, files, copy_message(tmp_path))
+    journal, collected = run(tmp_path, files, copy_message(tmp_path))
+    assert journal.skipped == 3
+    assert all(message.startswith("Skipped") for _, message in collected)
+
+def test_missing_or_empty_outputs_are_redone(tmp_path):
+    files = sources(tmp_path)
+    run(tmp_path, files, copy_message(tmp_path))
+    (tmp_path / "output" / "out_0.txt").unlink()
+    (tmp_path / "output" / "out_1.txt").write_bytes(b"")
+    journal, collected = run(tmp_path, files, copy_message(tmp_path))
+    assert journal.skipped == 1
+    assert sorted(message[0] for message in collected if not message[1].startswith("Skipped")) == \
+        [str(files[0]), str(files[1])]
+
+def test_rows_without_outputs_are_redone(tmp_path):
+    files = sources(tmp_path, 1)
+    run(tmp_path, files, lambda source: (source, "Done"))
+    journal, _ = run(tmp_path, files, copy_message(tmp_path))
+    assert journal.skipped == 0
+
+def test_failures_are_redone(tmp_path):
+    files = sources(tmp_path, 1)
+    run(tmp_path, files, lambda source: (source, "Error: boom", []))
+    journal, _ = run(tmp_path, files, copy_message(tmp_path))
+    assert journal.skipped == 0
+
+def test_old_journals_gain_the_outputs_column(tmp_path):
+    path = tmp_path / JOURNAL_NAME
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE items (source TEXT NOT NULL, operation TEXT NOT NULL, size INTEGER NOT NULL, "
+               "mtime_ns INTEGER NOT NULL, status TEXT NOT NULL, message TEXT, updated REAL NOT NULL, "
+               "PRIMARY KEY (source, operation))")
+    db.execute("INSERT INTO items VALUES ('a.txt', 'op', 1, 2, 'done', 'Done', 0)")
+    db.commit()
+    db.close()
+    journal = Journal(str(path))
+    assert not journal.finished("a.txt", "op", (1, 2))
+    journal.record("a.txt", "op", (1, 2), "done", "Done", [str(path)])
+    assert journal.finished("a.txt", "op", (1, 2))
+
+def test_files_without_outputs_are_redone(tmp_path):
+    files = sources(tmp_path, 1)
+    run(tmp_path, files, lambda source: (source, "Frames extracted to: output (emitted 0 frames by seeking)", []))
+    journal, _ = run(tmp_path, files, copy_message(tmp_path))
+    assert journal.skipped == 0
@@ -0,0 +1,117 @@
+import os
+import shutil
+import threading
+import pytest
+from utils import output_paths
+from utils.output_paths import new_output, partial_folder, publish_sequence
+
+def write(folder, base_name, suffix, ext, data=b"data"):
+    with new_output(str(folder), base_name, suffix, ext) as output:
+        with open(output.temp_path, "wb") as f:
+            f.write(data)
+    return output.path
+
+def test_taken_names_get_a_counter(tmp_path):
+    (tmp_path / "photo_small.png").write_bytes(b"old")
+    (tmp_path / "photo_small_001.png").write_bytes(b"old")
+    first = write(tmp_path, "photo", "_small", "png")
+    second = write(tmp_path, "photo", "_small", "png")
+    assert [os.path.basename(first), os.path.basename(second)] == ["photo_small_002.png", "photo_small_003.png"]
+
+def test_names_created_by_other_writers_are_skipped(tmp_path):
+    write(tmp_path, "clip", "", "txt")
+    # Created behind the index's back, as another process would.
+    (tmp_path / "clip_001.txt").write_bytes(b"other")
+    assert os.path.basename(write(tmp_path, "clip", "", "txt")) == "clip_002.txt"
+
+def test_failed_writes_leave_no_output(tmp_path):
+    with pytest.raises(RuntimeError):
+        with new_output(str(tmp_path), "clip", "", "txt") as output:
+            with open(output.temp_path, "wb") as f:
+                f.write(b"half")
+            raise RuntimeError
+    assert os.listdir(tmp_path) == []
+    # The rerun gets the name the failed write would have had.
+    assert os.path.basename(write(tmp_path, "clip", "", "txt")) == "clip.txt"
+
+def test_unpublished_outputs_are_hidden(tmp_path):
+    with new_output(str(tmp_path), "clip", "", "txt") as output:
+        assert [name for name in os.listdir(tmp_path) if not name.startswith(".")] == []
+    assert os.listdir(tmp_path) == ["clip.txt"]
+
+def test_stale_partials_are_removed(tmp_path):
+    (tmp_path / ".partial_0123456789ab_clip.txt").write_bytes(b"half")
+    (tmp_path / ".partial_frames").mkdir()
+    old = os.path.getmtime(tmp_path) - output_paths.STALE_PARTIAL_SECONDS - 60
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (old, old))
+    write(tmp_path, "clip", "", "txt")
+    assert os.listdir(tmp_path) == ["clip.txt"]
+
+def test_sequences_share_one_stem(tmp_path):
+    (tmp_path / "clip_0001.png").write_bytes(b"old")
+    with partial_folder(str(tmp_path)) as work_folder:
+        numbered = []
+        for number in (1, 2, 3):
+            path = os.path.join(work_folder, f"{number:04d}.png")
+            with open(path, "wb") as f:
+                f.write(b"frame")
+            numbered.append((number, path))
+        stem, paths = publish_sequence(numbered, str(tmp_path), "clip",
+                                       lambda stem, number: f"{stem}_{number:04d}.png")
+    assert stem == "clip_001"
+    assert [os.path.basename(path) for path in paths] == ["clip_001_0001.png", "clip_001_0002.png",
+                                                          "clip_001_0003.png"]
+    assert sorted(os.listdir(tmp_path)) == ["clip_0001.png"] + [os.path.basename(path) for path in paths]
+
+def test_own_writes_do_not_relist_the_folder(tmp_path, monkeypatch):
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(output_paths.os, "listdir", lambda path: listings.append(path) or listdir(path))
+    for _ in range(200):
+        write(tmp_path, "image", "_resized", "png")
+    assert len(listings) == 1
+    assert len(listdir(tmp_path)) == 200
+
+def test_freed_names_are_reused_after_a_relisting(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_paths, "RELIST_SECONDS", 0.0)
+    folder = tmp_path / "output"
+    folder.mkdir()
+    assert os.path.basename(write(folder, "a", "", "txt")) == "a.txt"
+    shutil.rmtree(folder)
+    folder.mkdir()
+    assert os.path.basename(write(folder, "a", "", "txt")) == "a.txt"
+
+def test_concurrent_writers_get_distinct_names(tmp_path):
+    barrier = threading.Barrier(8)
+    paths = []
+
+    def writer():
+        barrier.wait()
+        for _ in range(25):
+            paths.append(write(tmp_path, "frame", "", "png"))
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(paths)) == 200
+    assert sorted(os.listdir(tmp_path)) == ["frame.png"] + [f"frame_{i:03}.png" for i in range(1, 200)]
+
+def test_sequences_never_replace_existing_files(tmp_path):
+    # clip_0001 of an earlier run was deleted; the rest of it must survive.
+    for number in (2, 3):
+        (tmp_path / f"clip_{number:04d}.png").write_bytes(b"old")
+    with partial_folder(str(tmp_path)) as work_folder:
+        numbered = []
+        for number in (1, 2, 3):
+            path = os.path.join(work_folder, f"{number:04d}.png")
+            with open(path, "wb") as f:
+                f.write(b"new")
+            numbered.append((number, path))
+        stem, _ = publish_sequence(numbered, str(tmp_path), "clip", lambda stem, number: f"{stem}_{number:04d}.png")
+    assert stem == "clip_001"
+    assert (tmp_path / "clip_0002.png").read_bytes() == b"old"
+    assert (tmp_path / "clip_0003.png").read_bytes() == b"old"
+    assert not (tmp_path / "clip_0001.png").exists()
@@ -0,0 +1,43 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from utils.parallel import imap_process_pool
+from utils.scheduler import JobScheduler
+from queue import Queue
+
+def square_or_crash(value):
+    # Healthy items are still running when item 3 kills its worker.
+    time.sleep(0.05 if value == 3 else 0.3)
+    if value == 3:
+        os._exit(1)
+    return value * value
+
+def test_crash_only_fails_the_crashing_item():
+    results = list(imap_process_pool(square_or_crash, ((i,) for i in range(8)), workers=4))
+    assert [args for args, _, _ in results] == [(i,) for i in range(8)]
+    for (value,), result, error in results:
+        if value == 3:
+            assert isinstance(error, BrokenProcessPool)
+        else:
+            assert error is None and result == value * value
+
+def test_exceptions_are_reported_per_item():
+    results = list(imap_process_pool(int, [("1",), ("x",), ("3",)], workers=2))
+    assert [result for _, result, _ in results] == [1, None, 3]
+    assert isinstance(results[1][2], ValueError)
+
+def test_scheduler_process_crash_only_fails_its_job():
+    scheduler = JobScheduler(Queue(), max_workers=4)
+    try:
+        outcomes = {}
+        def job(value, batch):
+            try:
+                outcomes[value] = scheduler.run_in_process(square_or_crash, value)
+            except BrokenProcessPool:
+                outcomes[value] = "crashed"
+        done = Queue()
+        scheduler.submit("test", range(8), job, on_done=lambda batch, results: done.put(True))
+        done.get(timeout=60)
+        assert outcomes == {i: "crashed" if i == 3 else i * i for i in range(8)}
+    finally:
+        scheduler.shutdown()
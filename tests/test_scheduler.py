@@ -0,0 +1,47 @@
+import time
+import threading
+from queue import Queue
+from utils.scheduler import JobScheduler, ProgressEvent
+
+def test_scheduler_jobs_never_exceed_the_slot_budget():
+    scheduler = JobScheduler(Queue(), max_workers=4)
+    lock = threading.Lock()
+    used = [0, 0]  # current, peak
+    def job(slots):
+        def run(item, batch):
+            with lock:
+                used[0] += slots
+                used[1] = max(used[1], used[0])
+            time.sleep(0.02)
+            with lock:
+                used[0] -= slots
+        return run
+    try:
+        done = Queue()
+        scheduler.submit("heavy", range(6), job(3), priority=0, slots=3, on_done=lambda batch, results: done.put(1))
+        scheduler.submit("light", range(20), job(1), priority=1, on_done=lambda batch, results: done.put(1))
+        scheduler.submit("huge", range(2), job(4), priority=2, slots=10, on_done=lambda batch, results: done.put(1))
+        for _ in range(3):
+            done.get(timeout=30)
+        assert used[1] == 4
+    finally:
+        scheduler.shutdown()
+
+def test_results_are_reported_in_input_order():
+    events = Queue()
+    scheduler = JobScheduler(events, max_workers=4)
+    def job(item, batch):
+        time.sleep(0.01 * (8 - item))
+        return (item, f"done {item}")
+    try:
+        done = Queue()
+        scheduler.submit("image", range(8), job, on_done=lambda batch, results: done.put(1))
+        done.get(timeout=30)
+        messages = []
+        while not events.empty():
+            event = events.get()
+            if not isinstance(event, ProgressEvent):
+                messages.append(event[0])
+        assert messages == list(range(8))
+    finally:
+        scheduler.shutdown()
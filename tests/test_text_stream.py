@@ -0,0 +1,81 @@
+import io
+import random
+from utils import text_stream
+from utils.text_stream import dedupe_words, iter_words
+
+def write_words(path, count, vocabulary, seed=1):
+    rng = random.Random(seed)
+    words = [f"w{rng.randrange(vocabulary)}" for _ in range(count)]
+    path.write_text(" ".join(words))
+    return words
+
+def first_occurrences(words):
+    seen = set()
+    return [word for word in words if not (word in seen or seen.add(word))]
+
+def dedupe(path, **kwargs):
+    out = io.StringIO()
+    total, unique = dedupe_words(str(path), out, temp_dir=str(path.parent), **kwargs)
+    return out.getvalue().split(), total, unique
+
+def test_iter_words_carries_words_across_chunks():
+    text = "alpha  beta\ngamma delta epsilon "
+    assert list(iter_words(io.StringIO(text), chunk_size=3)) == text.split()
+
+def test_in_memory_dedup_keeps_first_occurrences(tmp_path):
+    words = write_words(tmp_path / "in.txt", 5000, 300)
+    kept, total, unique = dedupe(tmp_path / "in.txt")
+    assert kept == first_occurrences(words)
+    assert (total, unique) == (len(words), len(kept))
+
+def test_spill_to_disk_matches_in_memory_result(tmp_path):
+    words = write_words(tmp_path / "in.txt", 20000, 8000)
+    for compact in (False, True):
+        kept, total, unique = dedupe(tmp_path / "in.txt", memory_budget=20000, compact=compact)
+        assert kept == first_occurrences(words)
+        assert (total, unique) == (len(words), len(kept))
+    assert [p.name for p in tmp_path.iterdir()] == ["in.txt"]
+
+def test_oversized_partitions_are_split_again(tmp_path, monkeypatch):
+    # With two first-level partitions, each one holds far more records than
+    # the budget allows and has to be split again, more than once.
+    monkeypatch.setattr(text_stream, "_partition_count", lambda file_path, memory_budget: 2)
+    resolved = []
+    original = text_stream._resolve_partition
+    def resolve(part_path, divisor, memory_budget, kept_files, splittable=True):
+        resolved.append(part_path)
+        return original(part_path, divisor, memory_budget, kept_files, splittable)
+    monkeypatch.setattr(text_stream, "_resolve_partition", resolve)
+    words = write_words(tmp_path / "in.txt", 30000, 20000)
+    kept, total, unique = dedupe(tmp_path / "in.txt", memory_budget=1000)
+    assert kept == first_occurrences(words)
+    assert (total, unique) == (len(words), len(kept))
+    assert len(resolved) > 256
+
+def test_repeated_word_does_not_split_forever(tmp_path):
+    (tmp_path / "in.txt").write_text(" ".join([f"u{i}" for i in range(400)] + ["same"] * 20000))
+    kept, total, unique = dedupe(tmp_path / "in.txt", memory_budget=20000)
+    assert kept == [f"u{i}" for i in range(400)] + ["same"]
+    assert (total, unique) == (20400, 401)
+
+def test_compact_mode_holds_far_more_words_before_spilling(tmp_path, monkeypatch):
+    held = {}
+    def spill(file_path, words, first_word, start, seen, *args):
+        held[isinstance(seen, text_stream.DigestSet)] = len(seen)
+        return start, len(seen)
+    monkeypatch.setattr(text_stream, "_dedupe_on_disk", spill)
+    (tmp_path / "in.txt").write_text(" ".join(f"word{i}" for i in range(50000)))
+    for compact in (False, True):
+        dedupe(tmp_path / "in.txt", memory_budget=2 ** 16, compact=compact)
+    assert held[True] == 2 ** 16 // text_stream.DIGEST_ENTRY_BYTES
+    assert held[True] > 5 * held[False]
+
+def test_digest_set_matches_a_set():
+    rng = random.Random(3)
+    digests = [rng.getrandbits(64) for _ in range(5000)] + [0, 1, 2 ** 64 - 2]
+    table = text_stream.DigestSet(capacity=4)
+    for digest in digests[::2]:
+        table.add(digest)
+    expected = set(digests[::2])
+    assert len(table) == len(expected) and set(table) == expected
+    assert all((digest in table) == (digest in expected) for digest in digests)
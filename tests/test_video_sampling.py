@@ -0,0 +1,20 @@
+from engine.video import sample_times
+from utils.probe import frame_duration
+
+def test_count_mode_stays_before_the_last_frame():
+    # 10 s at 25 fps: the last frame is shown at 9.96 s.
+    times = sample_times(0.0, 10.0, "count", frame_count=4, frame_seconds=0.04)
+    assert times == [0.0, 2.5, 5.0, 7.5]
+    times = sample_times(0.0, 0.2, "count", frame_count=10, frame_seconds=0.04)
+    assert len(times) == 10 and max(times) < 0.16
+
+def test_interval_mode_clamps_the_last_sample():
+    times = sample_times(1.0, 3.0, "interval", interval_seconds=0.99, frame_seconds=0.04)
+    assert len(times) == 4
+    assert times[-1] < 1.0 + 3.0 - 0.04
+
+def test_frame_duration_from_the_frame_rate():
+    assert frame_duration({"streams": [{"codec_type": "video", "avg_frame_rate": "25/1"}]}) == 0.04
+    assert frame_duration({"streams": [{"codec_type": "video", "avg_frame_rate": "0/0",
+                                        "r_frame_rate": "50/1"}]}) == 0.02
+    assert frame_duration({"streams": []}) == 0.0
@@ -0,0 +1,128 @@
+# utils/corpus_dedup.py
+
+import os
+import shutil
+import tempfile
+from array import array
+from utils.parallel import imap_process_pool
+from utils.text_stream import WordWriter, iter_words, word_digest
+
+SHARDS = 16
+
+def dedupe_corpus(files, output_files, unit="words", workers=None, encoding=None, temp_dir=None):
+    """Deduplicate words or lines across many files; first occurrence wins.
+
+    Files are considered in the given order, so the result is deterministic.
+    1. Worker processes tokenize and hash each file and return the digests of
+       its locally-unique tokens, split into hash shards. Each shard array is
+       appended to its shard file as one block.
+    2. Each shard is resolved in its own worker: a digest is kept only for the
+       first file it appears in. The kept digests come back as blocks too.
+    3. Worker processes rewrite every file to its output, keeping only the
+       tokens it owns.
+
+    Shard data is only ever handled as whole per-file blocks in this process
+    (see _blocks()), so the per-token work all happens in the workers.
+
+    Yields (file_path, total tokens, unique tokens kept, error) per file, in
+    input order.
+    """
+    work_dir = tempfile.mkdtemp(prefix=".corpus_", dir=temp_dir)
+    try:
+        shard_paths = [os.path.join(work_dir, f"shard_{i}.bin") for i in range(SHARDS)]
+        shard_files = [open(path, 'wb') for path in shard_paths]
+        totals = []
+        errors = []
+        try:
+            jobs = ((file_path, unit, encoding) for file_path in files)
+            for index, (args, result, error) in enumerate(imap_process_pool(_collect_digests, jobs, workers=workers)):
+                totals.append(0 if error else result[0])
+                errors.append(error)
+                if error:
+                    continue
+                for shard_file, digests in zip(shard_files, result[1]):
+                    if digests:
+                        array('Q', (index, len(digests))).tofile(shard_file)
+                        digests.tofile(shard_file)
+        finally:
+            for shard_file in shard_files:
+                shard_file.close()
+
+        kept_by_file = [array('Q') for _ in files]
+        for _, kept, error in imap_process_pool(_resolve_shard, ((path,) for path in shard_paths), workers=workers):
+            if error:
+                raise error
+            for index, start, end in _blocks(kept):
+                kept_by_file[index].extend(kept[start:end])
+
+        jobs = ((file_path, unit, kept_by_file[i], output_files[i], encoding) for i, file_path in enumerate(files)
+                if errors[i] is None)
+        results = imap_process_pool(_write_kept, jobs, workers=workers)
+        for i, file_path in enumerate(files):
+            if errors[i] is not None:
+                yield file_path, 0, 0, errors[i]
+                continue
+            _, _, error = next(results)
+            yield file_path, totals[i], len(kept_by_file[i]), error
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def iter_units(infile, unit):
+    if unit == "lines":
+        for line in infile:
+            yield line.rstrip("\r\n")
+    else:
+        yield from iter_words(infile)
+
+def _collect_digests(file_path, unit, encoding):
+    seen = set()
+    shards = [array('Q') for _ in range(SHARDS)]
+    total = 0
+    with open(file_path, 'r', encoding=encoding) as infile:
+        for token in iter_units(infile, unit):
+            total += 1
+            digest = word_digest(token)
+            if digest not in seen:
+                seen.add(digest)
+                shards[digest % SHARDS].append(digest)
+    return total, shards
+
+def _blocks(records):
+    # Shard data is a run of blocks: file index, digest count, then the digests.
+    position = 0
+    while position < len(records):
+        index, count = records[position], records[position + 1]
+        position += 2
+        yield index, position, position + count
+        position += count
+
+def _resolve_shard(shard_path):
+    # Blocks are in input-file order, so the first file to hold a digest keeps it.
+    records = array('Q')
+    with open(shard_path, 'rb') as shard_file:
+        records.frombytes(shard_file.read())
+    seen = set()
+    kept = array('Q')
+    for index, start, end in _blocks(records):
+        block = array('Q')
+        for digest in records[start:end]:
+            if digest not in seen:
+                seen.add(digest)
+                block.append(digest)
+        if block:
+            kept.append(index)
+            kept.append(len(block))
+            kept.extend(block)
+    return kept
+
+def _write_kept(file_path, unit, kept, output_file, encoding):
+    owned = set(kept)
+    separator = "\n" if unit == "lines" else " "
+    with open(file_path, 'r', encoding=encoding) as infile, open(output_file, 'w', encoding=encoding) as outfile:
+        writer = WordWriter(outfile, separator=separator)
+        for token in iter_units(infile, unit):
+            digest = word_digest(token)
+            if digest in owned:
+                owned.discard(digest)
+                writer.write(token)
+        writer.flush()
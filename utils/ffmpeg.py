@@ -0,0 +1,147 @@
+# utils/ffmpeg.py
+
+import time
+import subprocess
+import threading
+
+from utils import tracing
+
+FFMPEG_QUIET_ARGS = ["-hide_banner", "-nostdin", "-loglevel", "error"]
+
+# Added while tracing: key=value progress blocks on stderr, split off again
+# before errors are reported.
+FFMPEG_PROGRESS_ARGS = ["-progress", "pipe:2", "-nostats"]
+
+_running = {}  # cancel_event -> set of Popen objects started for that batch
+_running_lock = threading.Lock()
+
+class FFmpegCancelled(Exception):
+    pass
+
+def run_ffmpeg(args, timeout=None, cancel_event=None):
+    """Run ffmpeg with the given arguments and captured, quiet output.
+
+    Raises subprocess.TimeoutExpired after killing the child if it runs longer
+    than timeout seconds, FFmpegCancelled if cancel_ffmpeg() was called for
+    cancel_event, and subprocess.CalledProcessError (with stderr) on failure.
+    """
+    # Temporary output files are created empty before ffmpeg runs, so it has
+    # to be allowed to overwrite them.
+    cmd = ["ffmpeg", "-y"] + FFMPEG_QUIET_ARGS + progress_args() + list(args)
+    return _run(cmd, timeout, cancel_event)
+
+def run_ffprobe(args, timeout=None, cancel_event=None):
+    """Run ffprobe with errors-only logging and return its stdout."""
+    cmd = ["ffprobe", "-v", "error"] + list(args)
+    return _run(cmd, timeout, cancel_event)
+
+def _run(cmd, timeout, cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled(cmd[-1])
+    start_ns = time.time_ns()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace")
+    _register(proc, cancel_event)
+    try:
+        if cancel_event is not None and cancel_event.is_set():
+            proc.kill()
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+    finally:
+        _unregister(proc, cancel_event)
+    stderr = _trace_run(cmd, start_ns, stderr)
+    if cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled(cmd[-1])
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=stderr)
+    return stdout
+
+def read_raw_frames(args, frame_size, free_buffers, cancel_event=None):
+    """Run ffmpeg writing raw video to stdout and yield one buffer per frame.
+
+    Frames are read straight into preallocated bytearrays taken from the
+    free_buffers queue, so nothing is copied on the Python side. The caller
+    must put every yielded buffer back once it is done with it; running out of
+    free buffers pauses reading, which keeps memory bounded.
+    """
+    cmd = ["ffmpeg"] + FFMPEG_QUIET_ARGS + progress_args() + list(args)
+    if cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled(cmd[-1])
+    start_ns = time.time_ns()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    _register(proc, cancel_event)
+    stderr_chunks = []
+    drain = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    try:
+        while True:
+            buffer = free_buffers.get()
+            view = memoryview(buffer)
+            filled = 0
+            while filled < frame_size:
+                count = proc.stdout.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            view.release()
+            if filled < frame_size:
+                free_buffers.put(buffer)
+                break
+            yield buffer
+        proc.wait()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        drain.join()
+        _unregister(proc, cancel_event)
+    stderr = _trace_run(cmd, start_ns, b"".join(stderr_chunks).decode(errors="replace"))
+    if cancel_event is not None and cancel_event.is_set():
+        raise FFmpegCancelled(cmd[-1])
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+def progress_args():
+    return FFMPEG_PROGRESS_ARGS if tracing.enabled() else []
+
+def _trace_run(cmd, start_ns, stderr):
+    # Record the run as an "ffmpeg"/"ffprobe" stage of the file being traced
+    # on this thread, with ffmpeg's speed and fps; return the real stderr.
+    if not tracing.enabled():
+        return stderr
+    details = {}
+    if FFMPEG_PROGRESS_ARGS[0] in cmd:
+        details, stderr = tracing.parse_ffmpeg_progress(stderr)
+    tracing.record(cmd[0], tracing.current_file(), start_ns, time.time_ns(), details)
+    return stderr
+
+def _register(proc, cancel_event):
+    with _running_lock:
+        _running.setdefault(cancel_event, set()).add(proc)
+
+def _unregister(proc, cancel_event):
+    with _running_lock:
+        procs = _running.get(cancel_event)
+        procs.discard(proc)
+        if not procs:
+            del _running[cancel_event]
+
+def cancel_ffmpeg(cancel_event):
+    """Flag a batch as cancelled and kill every ffmpeg child it started."""
+    cancel_event.set()
+    with _running_lock:
+        procs = list(_running.get(cancel_event, ()))
+    for proc in procs:
+        proc.kill()
+
+def describe_error(e):
+    # The last stderr line from ffmpeg is usually the useful one.
+    if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+        return e.stderr.strip().splitlines()[-1]
+    if isinstance(e, subprocess.TimeoutExpired):
+        return f"timed out after {e.timeout:g}s"
+    return str(e)
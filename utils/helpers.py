@@ -1,5 +1,12 @@
 import os
 import logging
+from utils.scanner import normalize_extensions, scan_files
+
+# Status messages that start with one of these mean a file was not finished.
+ERROR_PREFIXES = ("Error", "Unexpected error", "Cancelled")
+
+def is_error_message(message):
+    return str(message).startswith(ERROR_PREFIXES)
 
 def ensure_output_dir(output_dir):
     if not os.path.exists(output_dir):
@@ -10,8 +17,14 @@ def update_status_label(label, message):
     logging.info(message)
 
 def find_files_in_folder(folder, valid_extensions=None):
-    """Recursively find files within a folder."""
-    for root, _, files in os.walk(folder):
-        for file in files:
-            if valid_extensions is None or file.lower().endswith(tuple(valid_extensions)):
-                yield os.path.join(root, file)
\ No newline at end of file
+    """Recursively find files within a folder, skipping the tool's output folders."""
+    return scan_files(folder, valid_extensions)
+
+def iter_input_files(paths, valid_extensions):
+    """Yield the files to process from dropped paths: matching files as given, folders scanned."""
+    extensions = normalize_extensions(valid_extensions)
+    for path in paths:
+        if os.path.isdir(path):
+            yield from scan_files(path, extensions)
+        elif os.path.isfile(path) and os.path.splitext(path)[1].lower() in extensions:
+            yield path
\ No newline at end of file
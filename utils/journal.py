@@ -0,0 +1,154 @@
+# utils/journal.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from utils.helpers import is_error_message
+from utils.scanner import OUTPUT_DIR_NAME
+
+JOURNAL_NAME = ".journal.sqlite3"
+
+# Options that change how fast a batch runs, not what it writes.
+RUNTIME_OPTIONS = {"workers", "timeout", "memory_budget", "write_manifest"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    source TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    message TEXT,
+    updated REAL NOT NULL,
+    outputs TEXT,
+    PRIMARY KEY (source, operation)
+)
+"""
+
+class Journal:
+    """The outcome of every file processed into one output folder, in SQLite.
+
+    Rows are keyed by source path and operation; a row only counts while the
+    source still has the size and mtime it had when it was processed, it
+    recorded at least one output, and every one of them still exists and is
+    not empty.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Shards or several copies of the tool may share a folder; wait for their writes.
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(SCHEMA)
+        # Journals written before outputs were recorded; their rows never count as done.
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(items)")}
+        if "outputs" not in columns:
+            self.db.execute("ALTER TABLE items ADD COLUMN outputs TEXT")
+
+    def finished(self, source, operation, stat):
+        with self.lock:
+            row = self.db.execute("SELECT size, mtime_ns, status, outputs FROM items WHERE source = ? AND operation = ?",
+                                  (source, operation)).fetchone()
+        if row is None or row[2] != "done" or tuple(row[:2]) != stat or row[3] is None:
+            return False
+        outputs = json.loads(row[3])
+        return bool(outputs) and all(_has_content(path) for path in outputs)
+
+    def record(self, source, operation, stat, status, message, outputs=None):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (source, operation, stat[0], stat[1], status, message, time.time(),
+                             None if outputs is None else json.dumps(list(outputs))))
+
+def _has_content(path):
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def journal_for(source, create=False):
+    """Return the Journal of the output folder source writes to, or None if
+    there is none yet and create is not set."""
+    folder = os.path.join(os.path.dirname(source), OUTPUT_DIR_NAME)
+    with _journals_lock:
+        journal = _journals.get(folder)
+        if journal is None:
+            path = os.path.join(folder, JOURNAL_NAME)
+            if not create and not os.path.exists(path):
+                return None
+            os.makedirs(folder, exist_ok=True)
+            journal = _journals[folder] = Journal(path)
+        return journal
+
+def operation_key(kind, options):
+    """A short digest of what a batch does to each file, ignoring worker counts and the like."""
+    settings = {key: value for key, value in options.items() if key not in RUNTIME_OPTIONS}
+    text = json.dumps([kind, settings], sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def source_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+class BatchJournal:
+    """Stands in for the queue of one batch and journals each file's outcome.
+
+    pending() drops files that were finished by an earlier run with the same
+    operation (when resume is set) and remembers the rest. The first message
+    put for one of those files records it as done, or as failed if it is an
+    error, with the output paths given as the message's third field; a file
+    is only skipped while those outputs still exist, so one whose outputs
+    were deleted, or that reported none, is processed again. Every message
+    is passed on to queue. Files are identified by size
+    and mtime rather than a content hash, so checking 40k files costs 40k
+    stats instead of reading them all. Interrupted files have no row, so a
+    rerun picks up exactly the files that did not finish.
+    """
+
+    def __init__(self, kind, options, queue, resume=True):
+        self.operation = operation_key(kind, options)
+        self.queue = queue
+        self.resume = resume
+        self.skipped = 0
+        self.started = {}  # source -> stat when it was handed out
+        self.lock = threading.Lock()
+
+    def pending(self, files):
+        for file_path in files:
+            stat = source_stat(file_path)
+            if stat is None:
+                yield file_path
+                continue
+            journal = journal_for(file_path)
+            if self.resume and journal is not None and journal.finished(os.path.abspath(file_path), self.operation, stat):
+                self.skipped += 1
+                self.queue.put((file_path, f"Skipped, already done with these settings: {file_path}"))
+                continue
+            with self.lock:
+                self.started[file_path] = stat
+            yield file_path
+
+    def put(self, msg):
+        with self.lock:
+            stat = self.started.pop(msg[0], None) if isinstance(msg, tuple) else None
+        if stat is not None:
+            status = "failed" if is_error_message(msg[1]) else "done"
+            outputs = [os.path.abspath(path) for path in msg[2]] if len(msg) > 2 else None
+            try:
+                journal_for(msg[0], create=True).record(os.path.abspath(msg[0]), self.operation, stat, status, msg[1],
+                                                        outputs)
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"Could not journal {msg[0]}: {e}")
+        self.queue.put(msg)
@@ -0,0 +1,205 @@
+# utils/output_paths.py
+
+import os
+import time
+import uuid
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from utils import tracing
+
+# Outputs are written under hidden names with this prefix until they are complete.
+PARTIAL_PREFIX = ".partial_"
+
+# Temporary outputs this old are left over from a crash and removed when the
+# folder is listed.
+STALE_PARTIAL_SECONDS = 24 * 60 * 60
+
+# A folder whose contents changed is listed again at most this often. Our own
+# writes change it all the time, and names other writers take are found when
+# the exclusive create fails, so this only matters for names that were freed,
+# e.g. outputs deleted between two batches.
+RELIST_SECONDS = 10.0
+
+class _FolderIndex:
+    """Names known to exist in one output folder, and the next counter to try per name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = set()
+        self.next_counter = {}
+        self.stamp = None
+        self.listed = 0.0
+
+    def refresh(self, folder):
+        try:
+            st = os.stat(folder)
+        except FileNotFoundError:
+            os.makedirs(folder, exist_ok=True)
+            st = os.stat(folder)
+        stamp = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        if stamp == self.stamp:
+            return
+        # The old stamp is kept until the folder is listed, so a change seen
+        # too soon is still picked up by the next reservation after that.
+        if self.stamp is None or stamp[:2] != self.stamp[:2] or time.monotonic() - self.listed >= RELIST_SECONDS:
+            self.names = set(os.listdir(folder))
+            _remove_stale_partials(folder, self.names)
+            self.next_counter = {}
+            self.listed = time.monotonic()
+            self.stamp = stamp
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+class PendingOutput:
+    """An output being written under a hidden temporary name.
+
+    temp_path is in the output folder and keeps the extension, so encoders
+    still pick the format. publish() claims the next free name and renames
+    the file to it; path is None until then. Names follow the tool's
+    convention: {base_name}{suffix}.{ext} if free, otherwise
+    {base_name}{suffix}_001.{ext}, _002 and so on.
+    """
+
+    def __init__(self, output_folder, base_name, suffix, ext):
+        self.folder = output_folder
+        self.stem = f"{base_name}{suffix}"
+        self.ext = ext
+        self.temp_path = _create_partial(output_folder, f"{self.stem}.{ext}")
+        self.path = None
+
+    def publish(self):
+        _, (self.path,) = _claim(self.folder, self.stem, lambda stem: [f"{stem}.{self.ext}"], [self.temp_path])
+        return self.path
+
+    def discard(self):
+        _remove(self.temp_path)
+
+@contextmanager
+def new_output(output_folder, base_name, suffix, ext):
+    """Yield a PendingOutput; publish it when the block succeeds, remove it otherwise.
+
+    The final name is only claimed once the file is complete, so a crash or
+    error never leaves an empty or truncated file under a real output name,
+    and a resumed batch is given the same name again.
+    """
+    output = PendingOutput(output_folder, base_name, suffix, ext)
+    try:
+        yield output
+        output.publish()
+    except BaseException:
+        output.discard()
+        raise
+
+@contextmanager
+def partial_folder(output_folder):
+    """Yield a hidden temporary folder inside output_folder, removed afterwards.
+
+    For outputs written as many files, such as video frames; move them out
+    with publish_sequence() once they are complete.
+    """
+    path = tempfile.mkdtemp(prefix=PARTIAL_PREFIX, dir=output_folder)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def publish_sequence(numbered_paths, output_folder, base_name, name_for):
+    """Move finished files into output_folder as a numbered sequence under a new stem.
+
+    numbered_paths is a list of (number, temporary path) in order, and
+    name_for(stem, number) is the final file name. Stems are tried in the
+    same order as for single outputs (base_name, base_name_001, ...) until
+    every name of the sequence can be claimed, so no existing file is ever
+    replaced. Returns (stem, final paths), or (None, []) when there is
+    nothing to publish.
+    """
+    if not numbered_paths:
+        return None, []
+    numbers = [number for number, _ in numbered_paths]
+    return _claim(output_folder, base_name, lambda stem: [name_for(stem, number) for number in numbers],
+                  [temp_path for _, temp_path in numbered_paths])
+
+def _create_partial(output_folder, name):
+    # A unique name, so a file left behind by a crash never blocks anything.
+    while True:
+        path = os.path.join(output_folder, f"{PARTIAL_PREFIX}{uuid.uuid4().hex[:12]}_{name}")
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666))
+            return path
+        except FileExistsError:
+            continue
+
+def _claim(output_folder, base_stem, names_for, temp_paths):
+    stem, paths = _reserve(output_folder, base_stem, names_for)
+    moved = 0
+    try:
+        for temp_path, path in zip(temp_paths, paths):
+            os.replace(temp_path, path)
+            moved += 1
+    except OSError:
+        for path in paths[moved:]:
+            _remove(path)
+        raise
+    return stem, paths
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _remove_stale_partials(folder, names):
+    # Temporary files and folders of runs that crashed or were killed.
+    cutoff = time.time() - STALE_PARTIAL_SECONDS
+    for name in names:
+        if name.startswith(PARTIAL_PREFIX):
+            path = os.path.join(folder, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        os.remove(path)
+            except OSError:
+                continue
+
+def _reserve(output_folder, base_stem, names_for):
+    # Creates every name of the first stem whose names are all free empty,
+    # with an exclusive create, so concurrent jobs (or other processes) can
+    # never be handed the same name; _claim() replaces them with the finished
+    # files right away. If any name is taken, the ones already created are
+    # removed again and the next stem is tried. The next counter is
+    # remembered per name, so a claim does not probe every earlier output.
+    folder = os.path.abspath(output_folder)
+    with _indexes_lock:
+        index = _indexes.setdefault(folder, _FolderIndex())
+    key = names_for(base_stem)[0]
+    with tracing.stage("reserve_output"), index.lock:
+        index.refresh(folder)
+        counter = index.next_counter.get(key, 0)
+        while True:
+            stem = base_stem if counter == 0 else f"{base_stem}_{counter:03}"
+            names = names_for(stem)
+            counter += 1
+            if any(name in index.names for name in names):
+                continue
+            paths = _create_all([os.path.join(folder, name) for name in names])
+            index.names.update(names)
+            if paths is None:
+                continue
+            index.next_counter[key] = counter
+            return stem, paths
+
+def _create_all(paths):
+    # All of paths created empty, or None (with none left behind) if one exists.
+    for i, path in enumerate(paths):
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666))
+        except FileExistsError:
+            for created in paths[:i]:
+                _remove(created)
+            return None
+    return paths
@@ -0,0 +1,73 @@
+# utils/parallel.py
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+def imap_process_pool(func, items, workers=None, max_in_flight=None):
+    """Run func(*args) for each args tuple in a process pool.
+
+    Yields (args, result, error) in input order. Only max_in_flight items are
+    submitted at a time so huge batches keep memory flat. If a worker process
+    dies, every item that was still in flight is run again on its own in a
+    rebuilt pool, and only an item that crashes the pool by itself is reported
+    as failed, so one bad file cannot end the batch or take others with it.
+    """
+    workers = max(1, workers or default_worker_count())
+    max_in_flight = max(1, max_in_flight or workers * 2)
+    items = iter(items)
+    pending = deque()  # [args, future]; future is None until a suspect item is rerun alone
+    suspects = 0
+    executor = ProcessPoolExecutor(max_workers=workers)
+    exhausted = False
+    try:
+        while True:
+            while not suspects and not exhausted and len(pending) < max_in_flight:
+                try:
+                    args = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append([args, executor.submit(func, *args)])
+            if not pending:
+                break
+
+            entry = pending[0]
+            alone = entry[1] is None
+            if alone:
+                entry[1] = executor.submit(func, *entry[0])
+            try:
+                result = entry[1].result()
+            except BrokenProcessPool as e:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                if alone:
+                    pending.popleft()
+                    suspects -= 1
+                    yield entry[0], None, e
+                    continue
+                # Any item in flight may have killed the worker; rerun the
+                # unfinished ones one at a time to find out which.
+                for other in pending:
+                    if other[1] is not None and not _finished(other[1]):
+                        other[1] = None
+                        suspects += 1
+                continue
+            except Exception as e:
+                pending.popleft()
+                suspects -= alone
+                yield entry[0], None, e
+                continue
+            pending.popleft()
+            suspects -= alone
+            yield entry[0], result, None
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _finished(future):
+    # Done on its own, with a result or its own exception, before the pool broke.
+    return future.done() and not future.cancelled() and not isinstance(future.exception(), BrokenProcessPool)
@@ -0,0 +1,95 @@
+# utils/probe.py
+
+import os
+import json
+import threading
+from utils.ffmpeg import run_ffprobe
+
+_cache = {}  # (kind, absolute path) -> ((size, mtime_ns), result)
+_cache_lock = threading.Lock()
+
+def probe_media(file_path, timeout=None):
+    """Return ffprobe's format and stream info for a file as a dict.
+
+    Results are cached per (path, size, mtime), so probing an unchanged file
+    again costs one stat call instead of an ffprobe run.
+    """
+    return _cached("media", file_path, lambda path: json.loads(
+        run_ffprobe(["-show_format", "-show_streams", "-of", "json", path], timeout=timeout)))
+
+def first_stream(info, codec_type):
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return None
+
+def stream_bit_rate(info, stream):
+    # Some containers only report the overall bit rate.
+    bit_rate = stream.get("bit_rate") or info.get("format", {}).get("bit_rate")
+    return int(bit_rate) if bit_rate else None
+
+def display_size(stream):
+    # ffmpeg auto-rotates on decode, so a 90 degree rotation swaps the frame size.
+    width, height = int(stream["width"]), int(stream["height"])
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    if rotation is not None and abs(int(float(rotation))) % 180 == 90:
+        return height, width
+    return width, height
+
+def media_span(info):
+    """Return (start time, duration) in seconds of the first video stream,
+    falling back to the container's values, from probe_media() info."""
+    stream = first_stream(info, "video") or {}
+    container = info.get("format", {})
+    start = stream.get("start_time") or container.get("start_time") or 0
+    duration = stream.get("duration") or container.get("duration") or 0
+    return float(start), float(duration)
+
+def frame_duration(info):
+    """Seconds per frame of the first video stream from probe_media() info,
+    or 0.0 if ffprobe reports no frame rate."""
+    stream = first_stream(info, "video") or {}
+    for key in ("avg_frame_rate", "r_frame_rate"):
+        numerator, _, denominator = str(stream.get(key, "0/0")).partition("/")
+        try:
+            rate = float(numerator) / float(denominator or 1)
+        except (ValueError, ZeroDivisionError):
+            continue
+        if rate > 0:
+            return 1 / rate
+    return 0.0
+
+def probe_video_frames(file_path, timeout=None):
+    """Return [(pts_time, is_keyframe), ...] for the first video stream, in
+    presentation order.
+
+    Only packets are read (nothing is decoded), so this is a demux pass over
+    the file. Results are cached the same way as probe_media.
+    """
+    def probe(path):
+        output = run_ffprobe(["-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+                              "-of", "csv=p=0", path], timeout=timeout)
+        frames = []
+        for line in output.splitlines():
+            pts_time, _, flags = line.strip().partition(",")
+            if not pts_time or pts_time == "N/A":
+                continue
+            frames.append((float(pts_time), "K" in flags))
+        frames.sort()
+        return frames
+    return _cached("frames", file_path, probe)
+
+def _cached(kind, file_path, probe):
+    path = os.path.abspath(file_path)
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    with _cache_lock:
+        cached = _cache.get((kind, path))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    result = probe(path)
+    with _cache_lock:
+        _cache[(kind, path)] = (stamp, result)
+    return result
@@ -0,0 +1,117 @@
+# utils/scanner.py
+
+import os
+import json
+import time
+import hashlib
+import logging
+from utils import tracing
+
+# The tool's own results; never scanned as input.
+OUTPUT_DIR_NAME = "output"
+
+# Coarse filesystems (FAT, many network shares) keep mtimes to 1-2 seconds, so
+# a directory listed this soon after it changed can change again unnoticed.
+MTIME_SETTLE_NS = 2 * 10 ** 9
+
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                         "multi-utility-tool", "scan-index")
+
+def scan_files(folder, extensions=None, use_index=True):
+    """Yield the files under folder whose extension is in extensions, as they are found."""
+    for path, _, _ in scan_entries(folder, extensions, use_index):
+        yield path
+
+def scan_entries(folder, extensions=None, use_index=True):
+    """Yield (path, size, mtime_ns) for files under folder, in sorted order.
+
+    Directories are listed with os.scandir and `output` folders are skipped.
+    The listing of every directory is kept in a persisted index keyed by the
+    directory's mtime: adding, removing or renaming a file changes that mtime,
+    so a directory whose mtime is unchanged is served from the index without
+    being listed again. Sizes and mtimes of its files are then the ones
+    recorded at the last listing. The index is saved after a complete scan,
+    and only if something changed.
+    """
+    extensions = normalize_extensions(extensions)
+    root = os.path.abspath(folder)
+    old_index = load_index(root) if use_index else {}
+    new_index = {}
+    relisted = False
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        cached = old_index.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            files, subdirs = cached[1], cached[2]
+        else:
+            with tracing.stage("list_dir", path):
+                files, subdirs = list_directory(path)
+            relisted = True
+            if time.time_ns() - mtime_ns < MTIME_SETTLE_NS:
+                mtime_ns = None  # list it again next time
+        new_index[path] = [mtime_ns, files, subdirs]
+        for name, size, file_mtime_ns in files:
+            if extensions is None or os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(path, name), size, file_mtime_ns
+        stack.extend(os.path.join(path, name) for name in reversed(subdirs))
+    if use_index and (relisted or len(new_index) != len(old_index)):
+        save_index(root, new_index)
+
+def normalize_extensions(extensions):
+    if extensions is None:
+        return None
+    return {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions}
+
+def list_directory(path):
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != OUTPUT_DIR_NAME:
+                            subdirs.append(entry.name)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        files.append([entry.name, st.st_size, st.st_mtime_ns])
+                except OSError:
+                    continue
+    except OSError as e:
+        logging.warning(f"Could not list {path}: {e}")
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+def index_path(root):
+    digest = hashlib.blake2b(root.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+    return os.path.join(INDEX_DIR, f"{digest}.json")
+
+def load_index(root):
+    try:
+        with open(index_path(root), 'r', encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION or index.get("root") != root:
+        return {}
+    return index["dirs"]
+
+def save_index(root, dirs):
+    path = index_path(root)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(temp_path, 'w', encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "root": root, "dirs": dirs}, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not save scan index for {root}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
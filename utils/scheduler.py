@@ -0,0 +1,251 @@
+# utils/scheduler.py
+
+import time
+import itertools
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.ffmpeg import cancel_ffmpeg
+from utils.parallel import default_worker_count
+
+ProgressEvent = namedtuple("ProgressEvent", "batch_id tab done total elapsed finished")
+
+class Batch:
+    """Files dropped on one tab, run one job per file on the shared scheduler."""
+
+    def __init__(self, batch_id, tab, job, priority, max_concurrency, on_done, queue=None, slots=1):
+        self.id = batch_id
+        self.tab = tab
+        self.job = job
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.slots = slots
+        self.on_done = on_done
+        self.queue = queue
+        self.cancel_event = threading.Event()
+        self.pending = deque()
+        self.results = {}
+        self.posted = 0  # index of the next result to report
+        self.post_lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.running = 0
+        self.fed = False
+        self.started = time.monotonic()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+class JobScheduler:
+    """Runs the work of every tab on one fixed set of worker threads.
+
+    Each drop becomes a Batch. Workers always take the next file from the
+    highest-priority batch that is below its own concurrency cap and whose
+    job fits in the free slots. A job takes one slot, or more when it starts
+    several processes of its own (slots=N), so the whole app never runs more
+    than max_workers processes' worth of work at once. Batches are fed from a
+    background thread that pauses while max_pending files are already queued,
+    which means file lists can be streamed in without being materialized.
+
+    Status messages and ProgressEvents are put on `events`, and `notify` is
+    called after each one so the GUI can drain the queue.
+    """
+
+    def __init__(self, events, max_workers=None, notify=None, max_pending=256):
+        self.events = events
+        self.notify = notify
+        self.max_workers = max_workers or default_worker_count()
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._batches = []
+        self._ids = itertools.count(1)
+        self._stopping = False
+        self._slots_used = 0
+        self._process_pool = None
+        self._process_pool_lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, tab, items, job, priority=0, max_concurrency=None, on_done=None, queue=None, slots=1):
+        """Queue job(item, batch) for every item and return the Batch.
+
+        When job returns an (item, message, ...) tuple, it is posted as a
+        status message together with its third field, the output paths, if it
+        has one; jobs that post their own messages can
+        return anything else. Returned messages are reported in input order,
+        so a finished job waits for the ones before it. on_done(batch, results) is called once with the
+        results in input order after the last job finishes. Messages from
+        returned tuples go to queue instead of the events queue when given.
+        slots is how many workers' worth of processes one job runs (capped at
+        max_workers); that many slots stay taken while it runs.
+        """
+        slots = min(max(1, slots), self.max_workers)
+        batch = Batch(next(self._ids), tab, job, priority, max_concurrency or self.max_workers, on_done, queue, slots)
+        with self._cond:
+            self._batches.append(batch)
+        threading.Thread(target=self._feed, args=(batch, items), daemon=True).start()
+        return batch
+
+    def cancel(self, batch):
+        batch.cancel_event.set()
+        cancel_ffmpeg(batch.cancel_event)
+        with self._cond:
+            batch.pending.clear()
+            finished = self._finish_if_done(batch)
+            self._cond.notify_all()
+        if finished:
+            self._complete(batch)
+
+    def cancel_tab(self, tab=None):
+        with self._cond:
+            batches = [batch for batch in self._batches if tab is None or batch.tab == tab]
+        for batch in batches:
+            self.cancel(batch)
+
+    def run_in_process(self, func, *args):
+        """Run func(*args) in the shared process pool and wait for the result.
+
+        Raises BrokenProcessPool only if func crashes its worker process.
+        """
+        with self._process_pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            pool = self._process_pool
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            # Later jobs get a new pool.
+            with self._process_pool_lock:
+                if self._process_pool is pool:
+                    self._process_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+        # Every job in flight on the pool sees the crash. Run this one again in
+        # a process of its own: only the job that crashes there has failed.
+        with ProcessPoolExecutor(max_workers=1) as alone:
+            return alone.submit(func, *args).result()
+
+    def shutdown(self):
+        self.cancel_tab()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        with self._process_pool_lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+    def _feed(self, batch, items):
+        try:
+            for item in items:
+                with self._cond:
+                    while len(batch.pending) >= self.max_pending and not batch.cancelled:
+                        self._cond.wait()
+                    if batch.cancelled:
+                        break
+                    batch.pending.append((batch.total, item))
+                    batch.total += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            self._post((batch.tab, f"Error: {str(e)}"))
+        with self._cond:
+            batch.fed = True
+            finished = self._finish_if_done(batch)
+        if finished:
+            self._complete(batch)
+        else:
+            self._post_progress(batch)
+
+    def _next_batch(self):
+        best = None
+        for batch in self._batches:
+            if batch.pending and batch.running < batch.max_concurrency:
+                if best is None or batch.priority < best.priority:
+                    best = batch
+        # A job that needs more slots than are free waits for them, and lower
+        # priorities wait behind it instead of taking each slot as it frees up.
+        if best is not None and best.slots > self.max_workers - self._slots_used:
+            return None
+        return best
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+                while batch is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    batch = self._next_batch()
+                index, item = batch.pending.popleft()
+                batch.running += 1
+                self._slots_used += batch.slots
+                self._cond.notify_all()
+
+            try:
+                result = batch.job(item, batch)
+            except Exception as e:
+                result = (item, f"Error: {str(e)}")
+
+            with self._cond:
+                batch.running -= 1
+                self._slots_used -= batch.slots
+                batch.done += 1
+                batch.results[index] = result
+                finished = self._finish_if_done(batch)
+                self._cond.notify_all()
+            self._post_results(batch)
+            if finished:
+                self._complete(batch)
+            else:
+                self._post_progress(batch)
+
+    def _finish_if_done(self, batch):
+        # Called with the lock held; True exactly once per batch.
+        if batch.fed and not batch.pending and batch.running == 0 and batch in self._batches:
+            self._batches.remove(batch)
+            return True
+        return False
+
+    def _post_results(self, batch, flush=False):
+        # Reports the results that are next in input order. With flush set
+        # (batch finished), results behind items a cancel dropped go out too.
+        with batch.post_lock:
+            ready = []
+            with self._cond:
+                while batch.posted in batch.results or (flush and batch.posted < batch.total):
+                    result = batch.results.get(batch.posted)
+                    batch.posted += 1
+                    if isinstance(result, tuple):
+                        ready.append(result[:3])
+            for message in ready:
+                if batch.queue is not None:
+                    # It forwards to the events queue; the progress post notifies.
+                    batch.queue.put(message)
+                else:
+                    self._post(message)
+
+    def _complete(self, batch):
+        self._post_results(batch, flush=True)
+        if batch.total == 0 and not batch.cancelled:
+            skipped = getattr(batch.queue, "skipped", 0)
+            self._post((batch.tab, f"All {skipped} files were already done." if skipped else "No valid files were found."))
+        if batch.on_done is not None and not batch.cancelled:
+            try:
+                batch.on_done(batch, [batch.results[i] for i in sorted(batch.results)])
+            except Exception as e:
+                self._post((batch.tab, f"Error: {str(e)}"))
+        if batch.cancelled:
+            self._post((batch.tab, f"Cancelled after {batch.done} of {batch.total} files"))
+        self._post_progress(batch, finished=True)
+
+    def _post_progress(self, batch, finished=False):
+        self._post(ProgressEvent(batch.id, batch.tab, batch.done, batch.total,
+                                 time.monotonic() - batch.started, finished))
+
+    def _post(self, event):
+        self.events.put(event)
+        if self.notify is not None:
+            self.notify()
@@ -0,0 +1,337 @@
+# utils/text_stream.py
+
+import os
+import sys
+import heapq
+import shutil
+import hashlib
+import tempfile
+from array import array
+
+CHUNK_SIZE = 1 << 20  # characters read per chunk
+WRITE_BATCH = 8192  # words joined per write call
+
+# Rough per-entry cost of the in-memory sets, used against the memory budget:
+# a Python set entry on top of the word itself, and an 8-byte DigestSet slot
+# at the table's maximum load of one half.
+SET_ENTRY_OVERHEAD = 60
+DIGEST_ENTRY_BYTES = 16
+
+# Marks digests that were already seen before the spill point.
+SEEN_BEFORE = 2 ** 64 - 1
+
+# Spill records are (digest, position) pairs of unsigned 64-bit integers.
+RECORD_BYTES = 16
+
+# Spill files open at once; also the fan-out when a partition is split again.
+MAX_PARTITIONS = 256
+
+def iter_words(infile, chunk_size=CHUNK_SIZE):
+    """Yield whitespace-separated words from a text file object, chunk by chunk.
+
+    Same tokens as infile.read().split(), but only one chunk is held at a time;
+    a word cut by a chunk boundary is carried over to the next chunk.
+    """
+    carry = ""
+    while True:
+        chunk = infile.read(chunk_size)
+        if not chunk:
+            break
+        chunk = carry + chunk
+        words = chunk.split()
+        carry = words.pop() if words and not chunk[-1].isspace() else ""
+        yield from words
+    if carry:
+        yield carry
+
+def word_digest(word):
+    # 8-byte digests: fixed width and a negligible collision rate.
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+class DigestSet:
+    """A set of 64-bit digests in an open-addressing table of array('Q') slots.
+
+    Digests are stored as raw 8-byte values instead of Python ints, and the
+    table grows to stay at most half full, so an entry costs about
+    DIGEST_ENTRY_BYTES. Slots are chosen by the high bits of the digest,
+    since partitioning already uses the low ones. Zero marks an empty slot,
+    so a zero digest is tracked separately. capacity must be a power of two.
+    """
+
+    def __init__(self, capacity=64):
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.slots = array('Q', bytes(8 * capacity))
+        self.shift = 64 - (capacity.bit_length() - 1)
+        self.mask = capacity - 1
+        self.count = 0
+        self.has_zero = False
+
+    def __len__(self):
+        return self.count + self.has_zero
+
+    def __iter__(self):
+        if self.has_zero:
+            yield 0
+        for digest in self.slots:
+            if digest:
+                yield digest
+
+    def __contains__(self, digest):
+        if not digest:
+            return self.has_zero
+        slots, mask = self.slots, self.mask
+        index = digest >> self.shift
+        while True:
+            slot = slots[index]
+            if slot == digest:
+                return True
+            if not slot:
+                return False
+            index = (index + 1) & mask
+
+    def add(self, digest):
+        if not digest:
+            self.has_zero = True
+            return
+        if (self.count + 1) * 2 > len(self.slots):
+            old, has_zero = self.slots, self.has_zero
+            self._allocate(len(old) * 2)
+            self.has_zero = has_zero
+            for entry in old:
+                if entry:
+                    self._insert(entry)
+        self._insert(digest)
+
+    def _insert(self, digest):
+        slots, mask = self.slots, self.mask
+        index = digest >> self.shift
+        while True:
+            slot = slots[index]
+            if slot == digest:
+                return
+            if not slot:
+                slots[index] = digest
+                self.count += 1
+                return
+            index = (index + 1) & mask
+
+    def clear(self):
+        self._allocate(64)
+
+class WordWriter:
+    """Write words separated by spaces, in batches instead of one call per word."""
+
+    def __init__(self, outfile, batch=WRITE_BATCH, separator=" "):
+        self.outfile = outfile
+        self.batch = batch
+        self.separator = separator
+        self.pending = []
+
+    def write(self, word):
+        self.pending.append(word)
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.outfile.write(self.separator.join(self.pending) + self.separator)
+            self.pending = []
+
+def dedupe_words(file_path, outfile, memory_budget=256 * 2 ** 20, compact=False, encoding=None, temp_dir=None):
+    """Write the first occurrence of every word in file_path to outfile.
+
+    Unique words are tracked in memory, either exactly or as 8-byte digests
+    in a DigestSet when compact is set. If the set outgrows memory_budget bytes, the rest of
+    the file is deduplicated on disk instead: (digest, position) records are
+    hash-partitioned into temp files, each partition is resolved on its own,
+    and a second pass emits the surviving positions. Partitions that would not
+    fit the budget are split again, so memory stays bounded whatever the input
+    size, and the output order is unchanged. Spill files go to temp_dir.
+    Returns (total words, unique words).
+    """
+    writer = WordWriter(outfile)
+    seen = DigestSet() if compact else set()
+    used = 0
+    total = 0
+    with open(file_path, 'r', encoding=encoding) as infile:
+        words = iter_words(infile)
+        for word in words:
+            key = word_digest(word) if compact else word
+            if key in seen:
+                total += 1
+                continue
+            if used >= memory_budget:
+                writer.flush()
+                return _dedupe_on_disk(file_path, words, word, total, seen, writer, memory_budget, encoding, temp_dir)
+            seen.add(key)
+            used += DIGEST_ENTRY_BYTES if compact else sys.getsizeof(word) + SET_ENTRY_OVERHEAD
+            total += 1
+            writer.write(word)
+    writer.flush()
+    return total, len(seen)
+
+def _dedupe_on_disk(file_path, words, first_word, start, seen, writer, memory_budget, encoding, temp_dir):
+    partitions = _partition_count(file_path, memory_budget)
+    work_dir = tempfile.mkdtemp(prefix=".dedup_", dir=temp_dir)
+    try:
+        part_paths = [os.path.join(work_dir, f"part_{i}.bin") for i in range(partitions)]
+        parts = _PartitionWriter(part_paths)
+        try:
+            for key in seen:
+                parts.add(key if isinstance(key, int) else word_digest(key), SEEN_BEFORE)
+            seen_count = len(seen)
+            seen.clear()
+            position = start
+            parts.add(word_digest(first_word), position)
+            for word in words:
+                position += 1
+                parts.add(word_digest(word), position)
+        finally:
+            parts.close()
+
+        kept_files = []
+        unique = seen_count
+        for part_path in part_paths:
+            unique += _resolve_partition(part_path, partitions, memory_budget, kept_files)
+        kept_files = _merge_kept_files(kept_files, work_dir)
+
+        kept_positions = heapq.merge(*(_read_positions(path) for path in kept_files))
+        next_kept = next(kept_positions, None)
+        with open(file_path, 'r', encoding=encoding) as infile:
+            for index, word in enumerate(iter_words(infile)):
+                if next_kept is None:
+                    break
+                if index == next_kept:
+                    writer.write(word)
+                    next_kept = next(kept_positions, None)
+        writer.flush()
+        return position + 1, unique
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+class _PartitionWriter:
+    """Appends (digest, position) records to partition files, buffered.
+
+    A record goes to partition (digest // divisor) % len(paths). Splitting a
+    partition again with divisor set to the previous partition count uses
+    digest bits the earlier split did not.
+    """
+
+    def __init__(self, paths, divisor=1):
+        self.divisor = divisor
+        self.files = []
+        try:
+            for path in paths:
+                self.files.append(open(path, 'wb'))
+        except OSError:
+            self.close()
+            raise
+        self.buffers = [array('Q') for _ in paths]
+
+    def add(self, digest, position):
+        index = (digest // self.divisor) % len(self.files)
+        buffer = self.buffers[index]
+        buffer.append(digest)
+        buffer.append(position)
+        if len(buffer) >= 65536:
+            buffer.tofile(self.files[index])
+            del buffer[:]
+
+    def close(self):
+        for buffer, part_file in zip(self.buffers, self.files):
+            buffer.tofile(part_file)
+        for part_file in self.files:
+            part_file.close()
+
+def _resolve_partition(part_path, divisor, memory_budget, kept_files, splittable=True):
+    """Append the first-occurrence positions of part_path to kept files and
+    return how many there are.
+
+    A partition whose records could outgrow memory_budget in the set is split
+    by further digest bits first, so memory stays bounded whatever the input
+    size. Records are in position order, so the first record of every digest
+    is its first occurrence in the file.
+    """
+    records = os.path.getsize(part_path) // RECORD_BYTES
+    if splittable and records * DIGEST_ENTRY_BYTES > memory_budget and divisor < 2 ** 64:
+        fanout = min(MAX_PARTITIONS, max(2, -(-records * DIGEST_ENTRY_BYTES // memory_budget)))
+        base, _ = os.path.splitext(part_path)
+        sub_paths = [f"{base}_{i}.bin" for i in range(fanout)]
+        parts = _PartitionWriter(sub_paths, divisor)
+        try:
+            positions = _read_positions(part_path)
+            for digest, position in zip(positions, positions):
+                parts.add(digest, position)
+        finally:
+            parts.close()
+        os.remove(part_path)
+        # A split that moves nothing (one word repeated throughout) cannot help
+        # again; that partition only holds a few distinct digests anyway.
+        return sum(_resolve_partition(sub_path, divisor * fanout, memory_budget, kept_files,
+                                      os.path.getsize(sub_path) // RECORD_BYTES < records)
+                   for sub_path in sub_paths)
+
+    part_seen = DigestSet()
+    kept = array('Q')
+    unique = 0
+    folder, name = os.path.split(part_path)
+    kept_path = os.path.join(folder, "kept_" + name[len("part_"):])
+    with open(kept_path, 'wb') as kept_file:
+        positions = _read_positions(part_path)
+        for digest, position in zip(positions, positions):
+            if digest not in part_seen:
+                part_seen.add(digest)
+                if position != SEEN_BEFORE:
+                    kept.append(position)
+                    if len(kept) >= 65536:
+                        unique += len(kept)
+                        kept.tofile(kept_file)
+                        del kept[:]
+        unique += len(kept)
+        kept.tofile(kept_file)
+    os.remove(part_path)
+    kept_files.append(kept_path)
+    return unique
+
+def _merge_kept_files(kept_files, work_dir):
+    # Merge runs of sorted positions until they can all be open at once.
+    round_number = 0
+    while len(kept_files) > MAX_PARTITIONS:
+        merged = []
+        for i in range(0, len(kept_files), MAX_PARTITIONS):
+            group = kept_files[i:i + MAX_PARTITIONS]
+            merged_path = os.path.join(work_dir, f"merged_{round_number}_{i}.bin")
+            with open(merged_path, 'wb') as merged_file:
+                batch = array('Q')
+                for position in heapq.merge(*(_read_positions(path) for path in group)):
+                    batch.append(position)
+                    if len(batch) >= 65536:
+                        batch.tofile(merged_file)
+                        del batch[:]
+                batch.tofile(merged_file)
+            for path in group:
+                os.remove(path)
+            merged.append(merged_path)
+        kept_files = merged
+        round_number += 1
+    return kept_files
+
+def _partition_count(file_path, memory_budget):
+    # Each word costs 16 bytes on disk and a set entry while its partition is
+    # resolved; aim for partitions that fit the budget. At most MAX_PARTITIONS
+    # files are open at once, and partitions that are still too big are split
+    # again when they are resolved.
+    estimate = os.path.getsize(file_path) // 6 * (RECORD_BYTES + DIGEST_ENTRY_BYTES)
+    return max(16, min(MAX_PARTITIONS, -(-estimate // memory_budget)))
+
+def _read_positions(path, batch=65536):
+    with open(path, 'rb') as f:
+        while True:
+            positions = array('Q')
+            data = f.read(batch * positions.itemsize)
+            if not data:
+                return
+            positions.frombytes(data)
+            yield from positions
@@ -0,0 +1,197 @@
+# utils/tracing.py
+
+import os
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# Tracing is off unless enable() is called; stage() is then almost free.
+_enabled = False
+_events = []
+_lock = threading.Lock()
+_local = threading.local()
+
+class Span:
+    """One timed stage of processing a file; extra details go in args."""
+
+    __slots__ = ("name", "file", "start_ns", "args")
+
+    def __init__(self, name, file, args):
+        self.name = name
+        self.file = file
+        self.start_ns = time.time_ns()
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+class _NullSpan:
+    file = None
+
+    def set(self, **args):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+def enabled():
+    return _enabled
+
+@contextmanager
+def stage(name, file_path=None, measure_input=False, **args):
+    """Time a stage of processing file_path when tracing is enabled.
+
+    Yields a span whose set() adds details such as bytes_out; measure_input
+    records the size of file_path as bytes_in. Nested stages on the same
+    thread inherit the file of the enclosing stage.
+    """
+    if not _enabled:
+        yield NULL_SPAN
+        return
+    if measure_input:
+        try:
+            args["bytes_in"] = os.path.getsize(file_path)
+        except OSError:
+            pass
+    parent = getattr(_local, "span", None)
+    span = Span(name, file_path or (parent.file if parent is not None else None), args)
+    _local.span = span
+    try:
+        yield span
+    finally:
+        _local.span = parent
+        record(span.name, span.file, span.start_ns, time.time_ns(), span.args)
+
+def carry_file(func):
+    """Wrap func so stages it records on a worker thread keep this thread's file."""
+    file_path = current_file()
+    if file_path is None:
+        return func
+    def run(*args, **kwargs):
+        parent = getattr(_local, "span", None)
+        _local.span = Span(None, file_path, {})
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.span = parent
+    return run
+
+def annotate(**args):
+    """Add details to the innermost stage on this thread, if any."""
+    span = getattr(_local, "span", None)
+    if span is not None:
+        span.set(**args)
+
+def current_file():
+    span = getattr(_local, "span", None)
+    return span.file if span is not None else None
+
+def record(name, file_path, start_ns, end_ns, args=None):
+    event = {
+        "name": name,
+        "file": file_path,
+        "ts": start_ns // 1000,
+        "dur": max(0, end_ns - start_ns) // 1000,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": args or {},
+    }
+    with _lock:
+        _events.append(event)
+
+def drain():
+    """Return and forget everything recorded so far."""
+    global _events
+    with _lock:
+        events, _events = _events, []
+    return events
+
+def merge(events):
+    with _lock:
+        _events.extend(events)
+
+def call_traced(func, *args):
+    """Run func(*args) with tracing on, for use in worker processes only.
+
+    Returns (result, events); pass the events to merge() in the parent.
+    """
+    enable()
+    drain()
+    try:
+        return func(*args), drain()
+    finally:
+        enable(False)
+
+def export_chrome_trace(events, path):
+    """Write events as a Chrome trace, viewable in Perfetto or chrome://tracing."""
+    trace_events = []
+    for event in events:
+        args = dict(event["args"], file=event["file"])
+        trace_events.append({"name": event["name"], "cat": "stage", "ph": "X", "ts": event["ts"],
+                             "dur": event["dur"], "pid": event["pid"], "tid": event["tid"], "args": args})
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+def summary_table(events):
+    """Per-stage totals as a text table: calls, time, p95, bytes and ffmpeg speed."""
+    stages = {}
+    for event in events:
+        stages.setdefault(event["name"], []).append(event)
+    header = f"{'stage':<14}{'calls':>7}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'MB in':>9}{'MB out':>9}{'MB/s':>8}  ffmpeg"
+    lines = [header, "-" * len(header)]
+    for name, group in sorted(stages.items(), key=lambda item: -sum(e["dur"] for e in item[1])):
+        durations = sorted(e["dur"] for e in group)
+        total = sum(durations) / 1e6
+        bytes_in = sum(e["args"].get("bytes_in", 0) for e in group)
+        bytes_out = sum(e["args"].get("bytes_out", 0) for e in group)
+        rate = max(bytes_in, bytes_out) / 2 ** 20 / total if total else 0.0
+        speeds = [e["args"]["speed"] for e in group if e["args"].get("speed")]
+        fps = [e["args"]["fps"] for e in group if e["args"].get("fps")]
+        ffmpeg = ""
+        if speeds:
+            ffmpeg = f"speed {sum(speeds) / len(speeds):.2f}x"
+        if fps:
+            ffmpeg += f" fps {sum(fps) / len(fps):.1f}"
+        lines.append(f"{name:<14}{len(group):>7}{total:>10.2f}{total / len(group) * 1000:>10.1f}"
+                     f"{durations[math.ceil(0.95 * len(durations)) - 1] / 1000:>10.1f}"
+                     f"{bytes_in / 2 ** 20:>9.2f}{bytes_out / 2 ** 20:>9.2f}{rate:>8.1f}  {ffmpeg}")
+    return "\n".join(lines)
+
+def parse_ffmpeg_progress(stderr):
+    """Split ffmpeg -progress key=value lines out of stderr.
+
+    Returns (details of the last progress block, remaining stderr). The
+    details hold fps, speed (as a multiple of real time), frames and
+    total_size when ffmpeg reported them.
+    """
+    progress = {}
+    other = []
+    for line in stderr.splitlines():
+        key, sep, value = line.partition("=")
+        if sep and key in PROGRESS_KEYS:
+            progress[key] = value.strip()
+        else:
+            other.append(line)
+    details = {}
+    try:
+        if progress.get("fps"):
+            details["fps"] = float(progress["fps"])
+        if progress.get("speed", "N/A").rstrip("x") not in ("N/A", ""):
+            details["speed"] = float(progress["speed"].rstrip("x"))
+        if progress.get("frame"):
+            details["frames"] = int(progress["frame"])
+        if progress.get("total_size", "N/A") != "N/A":
+            details["bytes_out"] = int(progress["total_size"])
+    except ValueError:
+        pass
+    return details, "\n".join(other)
+
+PROGRESS_KEYS = {
+    "frame", "fps", "stream_0_0_q", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+    "dup_frames", "drop_frames", "speed", "progress",
+}
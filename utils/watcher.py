@@ -0,0 +1,251 @@
+# utils/watcher.py
+
+import os
+import sys
+import time
+import errno
+import ctypes
+import select
+import struct
+import logging
+import threading
+from utils.scanner import OUTPUT_DIR_NAME, normalize_extensions, scan_entries
+
+# A file is handed over once its size and mtime have not changed for this
+# long, so files still being copied in are not processed half-written.
+SETTLE_SECONDS = 2.0
+
+# How often the polling fallback rescans the folder.
+POLL_SECONDS = 2.0
+
+class FolderWatcher:
+    """Watch a folder tree and report new or changed files once they settle.
+
+    on_ready(paths) is called on the watcher's thread with a sorted list of
+    files whose extension is in extensions. Files already in the folder are
+    taken as done unless include_existing is set; after that only files that
+    appear or change are reported, each time they settle. Changes are picked
+    up with inotify on Linux and by rescanning every poll_seconds elsewhere,
+    or when inotify is unavailable. `output` folders are never watched.
+    """
+
+    def __init__(self, folder, extensions, on_ready, settle_seconds=SETTLE_SECONDS, poll_seconds=POLL_SECONDS,
+                 include_existing=False):
+        self.folder = os.path.abspath(folder)
+        self.extensions = normalize_extensions(extensions)
+        self.on_ready = on_ready
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.include_existing = include_existing
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        events = InotifyEvents.open(self.folder, self.extensions)
+        if events is None:
+            events = PollingEvents(self.folder, self.extensions, self.poll_seconds)
+        self.backend = events.name
+        try:
+            self._watch(events)
+        except Exception:
+            logging.exception(f"Watching {self.folder} failed")
+        finally:
+            events.close()
+
+    def _watch(self, events):
+        # The scan index keeps sizes and mtimes from the last listing, which
+        # misses files edited in place since, so take them from a real listing.
+        done = {path: (size, mtime_ns)
+                for path, size, mtime_ns in scan_entries(self.folder, self.extensions, use_index=False)}
+        pending = {}  # path -> (size, mtime_ns, monotonic time it last changed)
+        if self.include_existing:
+            started = time.monotonic()
+            pending = {path: stat + (started,) for path, stat in done.items()}
+            done = {}
+        while not self._stop.is_set():
+            timeout = self.settle_seconds / 4 if pending else None
+            for path, stat in events.wait(timeout, self._stop).items():
+                if stat is None:
+                    stat = file_stat(path)
+                if stat is not None and stat != done.get(path) and stat != pending.get(path, ())[:2]:
+                    pending[path] = stat + (time.monotonic(),)
+            ready = []
+            now = time.monotonic()
+            for path, (size, mtime_ns, changed) in list(pending.items()):
+                stat = file_stat(path)
+                if stat is None:
+                    del pending[path]
+                elif stat != (size, mtime_ns):
+                    pending[path] = stat + (now,)
+                elif now - changed >= self.settle_seconds:
+                    del pending[path]
+                    done[path] = stat
+                    ready.append(path)
+            if ready and not self._stop.is_set():
+                self.on_ready(sorted(ready))
+
+def file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+class PollingEvents:
+    """Reports every matching file, with its size and mtime, once per poll."""
+
+    name = "polling"
+
+    def __init__(self, folder, extensions, poll_seconds):
+        self.folder = folder
+        self.extensions = extensions
+        self.poll_seconds = poll_seconds
+        self.next_poll = time.monotonic() + poll_seconds
+
+    def wait(self, timeout, stop):
+        delay = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < delay:
+            stop.wait(timeout)
+            return {}
+        stop.wait(max(0.0, delay))
+        self.next_poll = time.monotonic() + self.poll_seconds
+        # The scan index cannot see files rewritten in place, so list for real.
+        return {path: (size, mtime_ns)
+                for path, size, mtime_ns in scan_entries(self.folder, self.extensions, use_index=False)}
+
+    def close(self):
+        pass
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+class InotifyEvents:
+    """Reports files named in inotify events for a folder tree (Linux only)."""
+
+    name = "inotify"
+
+    @classmethod
+    def open(cls, folder, extensions):
+        """Return a watcher for folder, or None if inotify cannot be used."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        events = cls(libc, fd, folder, extensions)
+        try:
+            events.add_tree(folder)
+        except OSError as e:
+            # Usually ENOSPC: the per-user watch limit is used up.
+            logging.warning(f"inotify unavailable for {folder} ({e}), polling instead")
+            events.close()
+            return None
+        return events
+
+    def __init__(self, libc, fd, folder, extensions):
+        self.libc = libc
+        self.fd = fd
+        self.folder = folder
+        self.extensions = extensions
+        self.dirs = {}  # watch descriptor -> directory
+
+    def add_tree(self, top):
+        """Watch top and its subfolders; return the matching files already in them."""
+        found = {}
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue
+                raise OSError(err, os.strerror(err), path)
+            self.dirs[wd] = path
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != OUTPUT_DIR_NAME:
+                                stack.append(entry.path)
+                        elif self.matches(entry.name):
+                            found[entry.path] = None
+            except OSError:
+                continue
+        return found
+
+    def add_new_tree(self, top):
+        try:
+            return self.add_tree(top)
+        except OSError as e:
+            logging.warning(f"Could not watch {top}: {e}")
+            return {}
+
+    def matches(self, name):
+        return self.extensions is None or os.path.splitext(name)[1].lower() in self.extensions
+
+    def wait(self, timeout, stop):
+        # Wake up at least once a second to notice stop().
+        readable, _, _ = select.select([self.fd], [], [], min(timeout or 1.0, 1.0))
+        if not readable:
+            return {}
+        changed = {}
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: look at everything again.
+                changed.update(self.add_new_tree(self.folder))
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            folder = self.dirs.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+            if mask & IN_ISDIR:
+                # A new or moved-in folder may already hold files.
+                if mask & (IN_CREATE | IN_MOVED_TO) and name != OUTPUT_DIR_NAME:
+                    changed.update(self.add_new_tree(path))
+            elif self.matches(name):
+                changed[path] = None
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None